@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+
+# Lower number = delivered first when alerts queue up
+ALERT_PRIORITY = {'human': 0, 'animal': 1, 'bird': 2}
+
+# (duration in seconds, frequency in Hz, volume) per type, as in create_basic_alert_sound
+ALERT_TONES = {
+    'human': (1.5, 660.0, 0.8),
+    'animal': (1.2, 440.0, 0.7),
+    'bird': (0.8, 880.0, 0.6),
+}
+
+
+def synthesize_tone(duration, freq, volume, sample_rate=44100):
+    """Pulsing sine tone as 16-bit mono PCM, the same sound create_basic_alert_sound writes"""
+    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    tone = np.sin(freq * 2 * np.pi * t) * (0.7 + 0.3 * np.sin(8 * np.pi * t))
+    return (np.clip(tone * volume, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+class Alert:
+    """One alert on its way to the sinks"""
+
+    def __init__(self, detected_type, detected_class, camera, confidence=None, box=None, track=None,
+                 zone=None, image=None, captured_at=None):
+        self.detected_type = detected_type
+        self.detected_class = detected_class
+        self.camera = camera
+        self.confidence = confidence
+        self.box = box
+        self.track = track
+        self.zone = zone
+        self.image = image
+        self.timestamp = time.time()
+        # Latency is measured from frame capture when known, else from when the alert was raised
+        self.captured_at = captured_at if captured_at is not None else time.monotonic()
+
+    @property
+    def priority(self):
+        return ALERT_PRIORITY.get(self.detected_type, len(ALERT_PRIORITY))
+
+    def to_dict(self):
+        return {
+            'time': datetime.fromtimestamp(self.timestamp).isoformat(timespec='milliseconds'),
+            'type': self.detected_type,
+            'class': self.detected_class,
+            'camera': self.camera,
+            'confidence': None if self.confidence is None else round(float(self.confidence), 3),
+            'box': None if self.box is None else [int(v) for v in self.box],
+            'track': self.track,
+            'zone': self.zone,
+            'image': self.image,
+        }
+
+
+class SoundSink:
+    """Plays an in-memory sound per alert type; pygame mixes it in the background"""
+
+    name = 'sound'
+
+    def __init__(self, sound_dir=None, sample_rate=44100):
+        import pygame
+        pygame.mixer.init(frequency=sample_rate, size=-16, channels=1)
+        self.sounds = {}
+        for detected_type, (duration, freq, volume) in ALERT_TONES.items():
+            # A customised sound file (see create_different_alerts.py) is decoded once up front
+            path = os.path.join(sound_dir, f'{detected_type}_alert.wav') if sound_dir else None
+            if path and os.path.exists(path):
+                self.sounds[detected_type] = pygame.mixer.Sound(path)
+            else:
+                pcm = synthesize_tone(duration, freq, volume, sample_rate)
+                self.sounds[detected_type] = pygame.mixer.Sound(buffer=pcm.tobytes())
+
+    def send(self, alert):
+        sound = self.sounds.get(alert.detected_type)
+        if sound is not None:
+            sound.play()
+
+
+class LogSink:
+    """Appends one JSON line per alert to a local file"""
+
+    name = 'log'
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert.to_dict()) + '\n')
+
+
+class WebhookSink:
+    """POSTs each alert as JSON to an HTTP endpoint"""
+
+    name = 'webhook'
+
+    def __init__(self, url, timeout=5.0, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+
+    def send(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert.to_dict()).encode(),
+                                         headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class SinkWorker:
+    """Delivers alerts to one sink from its own thread, most urgent first"""
+
+    def __init__(self, sink, max_pending=64, latency=None):
+        self.sink = sink
+        self.name = sink.name
+        self.max_pending = max_pending
+        self.latency = latency  # Optional LatencyRecorder for capture-to-delivery time
+        self.heap = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Statistics
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+
+        self.thread = threading.Thread(target=self.worker, name=f'alert-{self.name}', daemon=True)
+        self.thread.start()
+
+    def put(self, alert):
+        item = (alert.priority, next(self.sequence), alert)
+        with self.condition:
+            if len(self.heap) >= self.max_pending:
+                # Full: the least urgent, newest alert makes room (possibly the new one itself)
+                worst = max(self.heap, key=lambda queued: queued[:2])
+                self.dropped += 1
+                if item[:2] > worst[:2]:
+                    return
+                self.heap.remove(worst)
+                heapq.heapify(self.heap)
+            heapq.heappush(self.heap, item)
+            self.condition.notify()
+
+    def worker(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.heap or self.closed)
+                if not self.heap:
+                    return
+                alert = heapq.heappop(self.heap)[2]
+            try:
+                self.sink.send(alert)
+                self.delivered += 1
+                if self.latency is not None:
+                    self.latency.record(f'alert_{self.name}', time.monotonic() - alert.captured_at)
+            except Exception as e:
+                self.failed += 1
+                print(f"Alert {self.name} failed: {e}")
+
+    def pending_count(self):
+        with self.condition:
+            return len(self.heap)
+
+    def close(self, timeout=5.0):
+        """Deliver what is queued, then stop"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout)
+
+
+class AlertDispatcher:
+    """Applies per-type, per-zone cooldowns and hands alerts to every sink without blocking.
+
+    Each sink has its own worker thread, so a slow webhook never delays the sound.
+    """
+
+    def __init__(self, sinks, cooldowns=None, default_cooldown=5.0, max_pending=64, latency=None):
+        self.cooldowns = cooldowns or {}  # Seconds per alert type
+        self.default_cooldown = default_cooldown
+        self.last_alert = {}  # (type, camera, zone) -> time of the last alert sent
+        self.lock = threading.Lock()
+        self.workers = [SinkWorker(sink, max_pending, latency) for sink in sinks]
+
+        # Statistics
+        self.sent = 0
+        self.suppressed = 0
+
+    def submit(self, alert):
+        """Queue an alert for every sink; False if it is still cooling down"""
+        now = time.monotonic()
+        # A bird at the pond doesn't silence a person at the gate, nor a bird in another zone
+        key = (alert.detected_type, alert.camera, alert.zone)
+        cooldown = self.cooldowns.get(alert.detected_type, self.default_cooldown)
+        with self.lock:
+            if now - self.last_alert.get(key, float('-inf')) < cooldown:
+                self.suppressed += 1
+                return False
+            self.last_alert[key] = now
+            self.sent += 1
+        for worker in self.workers:
+            worker.put(alert)
+        return True
+
+    def close(self, timeout=5.0):
+        for worker in self.workers:
+            worker.close(timeout)
+
+    def summary(self):
+        sinks = ", ".join(f"{worker.name} {worker.delivered} ok/{worker.failed} failed/{worker.dropped} dropped"
+                          for worker in self.workers)
+        return f"{self.sent} sent, {self.suppressed} in cooldown; {sinks}"
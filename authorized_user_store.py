@@ -0,0 +1,289 @@
+import json
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from face_index import ENCODING_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_file(f):
+    """Block until this process holds the exclusive lock on an open file"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK gives up after 10 seconds, keep waiting
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_id(path):
+    """(inode, size) of a file, None if it doesn't exist; a replaced file gets a new inode"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size
+
+
+class AuthorizedUserStore:
+    """Append-only store of authorized users' face encodings.
+
+    Encodings live in a memory-mapped float32 .npy matrix and names/metadata in a
+    JSON-lines index next to it. Adding a user writes one matrix row and appends one
+    index line; deleting appends a tombstone. compact() rewrites both files without
+    the deleted rows. Nothing is pickled, so the store is safe to copy between units.
+
+    Several processes may write to the same store (the live system and bulk_enroll.py):
+    every change holds an exclusive lock on `store.lock` and first catches up with
+    whatever the others appended, grew or compacted.
+    """
+
+    def __init__(self, directory, initial_capacity=64, compact_ratio=0.25):
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, 'encodings.npy')
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self.lock_path = os.path.join(directory, 'store.lock')
+        self.initial_capacity = initial_capacity
+        self.compact_ratio = compact_ratio  # Compact once this share of rows are tombstones
+        self.lock = threading.RLock()
+        self.lock_file = None  # Open while this process holds the store lock
+        self.lock_depth = 0
+
+        self.matrix = None
+        self.matrix_id = None  # file_id() of the mapped matrix
+        self.index_inode = None
+        self.index_offset = 0  # Bytes of the index already replayed
+        self.rows = []  # Metadata per matrix row, None for deleted rows
+        self.deleted = 0
+        os.makedirs(directory, exist_ok=True)
+        with self.locked():
+            pass
+
+    @contextmanager
+    def locked(self):
+        """Hold the store against other threads and processes, caught up with their changes"""
+        with self.lock:
+            if self.lock_depth == 0:
+                self.lock_file = open(self.lock_path, 'a+b')
+                try:
+                    lock_file(self.lock_file)
+                    self.refresh()
+                except BaseException:
+                    self.lock_file.close()
+                    self.lock_file = None
+                    raise
+            self.lock_depth += 1
+            try:
+                yield self
+            finally:
+                self.lock_depth -= 1
+                if self.lock_depth == 0:
+                    unlock_file(self.lock_file)
+                    self.lock_file.close()
+                    self.lock_file = None
+
+    def refresh(self):
+        """Re-open what another process replaced and replay what it appended"""
+        index_id = file_id(self.index_path)
+        replaced = index_id is not None and (index_id[0] != self.index_inode or index_id[1] < self.index_offset)
+        if self.matrix is None or file_id(self.matrix_path) != self.matrix_id or replaced:
+            self.open()
+        elif index_id is not None and index_id[1] > self.index_offset:
+            self.read_index()
+
+    def open(self):
+        """Memory-map the matrix and replay the index"""
+        self.matrix = None
+        if os.path.exists(self.matrix_path):
+            self.matrix = np.load(self.matrix_path, mmap_mode='r+', allow_pickle=False)
+        else:
+            self.matrix = self.create_matrix(self.matrix_path, self.initial_capacity)
+        self.matrix_id = file_id(self.matrix_path)
+
+        self.rows = []
+        self.deleted = 0
+        self.index_offset = 0
+        index_id = file_id(self.index_path)
+        self.index_inode = index_id[0] if index_id is not None else None
+        self.read_index()
+
+    def read_index(self):
+        """Replay the index lines after the ones already applied (with the store locked)"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r+b') as f:
+            f.seek(self.index_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A torn last line from a power cut: cut it off so the next line starts clean
+                    f.truncate(self.index_offset)
+                    break
+                self.index_offset += len(line)
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except ValueError:
+                    print(f"Skipping unreadable line in {self.index_path}")
+                    continue
+                if record is not None:
+                    self.apply(record)
+
+    def apply(self, record):
+        if record['op'] == 'add':
+            row = record['row']
+            while len(self.rows) <= row:
+                self.rows.append(None)
+            self.rows[row] = {key: value for key, value in record.items() if key not in ('op', 'row')}
+        elif record['op'] == 'delete':
+            if record['row'] < len(self.rows) and self.rows[record['row']] is not None:
+                self.rows[record['row']] = None
+                self.deleted += 1
+
+    @staticmethod
+    def create_matrix(path, capacity):
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                           shape=(capacity, ENCODING_SIZE))
+        matrix.flush()
+        return matrix
+
+    def append_record(self, record):
+        with open(self.index_path, 'ab') as f:
+            line = (json.dumps(record) + "\n").encode('utf-8')
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if self.index_inode is None:
+            self.index_inode = file_id(self.index_path)[0]
+        self.index_offset += len(line)
+
+    def grow(self):
+        """Double the matrix capacity (amortized O(1) appends)"""
+        capacity = max(self.initial_capacity, 2 * len(self.matrix))
+        temp_path = self.matrix_path + '.tmp'
+        grown = self.create_matrix(temp_path, capacity)
+        grown[:len(self.matrix)] = self.matrix
+        grown.flush()
+        del grown
+        self.matrix = None
+        os.replace(temp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode='r+', allow_pickle=False)
+        self.matrix_id = file_id(self.matrix_path)
+
+    def add(self, name, encoding, **metadata):
+        """Append one user and return its row number"""
+        with self.locked():
+            row = len(self.rows)
+            if row >= len(self.matrix):
+                self.grow()
+
+            # The row is written first; the index line is what makes it visible
+            self.matrix[row] = np.asarray(encoding, dtype=np.float32)
+            self.matrix.flush()
+            record = {'op': 'add', 'row': row, 'name': name, 'added': time.time()}
+            record.update(metadata)
+            self.append_record(record)
+            self.apply(record)
+            return row
+
+    def delete(self, name):
+        """Tombstone every row with this name and return how many were removed"""
+        with self.locked():
+            return self.delete_rows([row for row, meta in enumerate(self.rows)
+                                     if meta is not None and meta['name'] == name])
+
+    def delete_rows(self, rows):
+        """Tombstone the given rows and return how many were removed.
+
+        Row numbers change when the store is compacted, so rows read from metadata()
+        must be deleted inside the same locked() block.
+        """
+        with self.locked():
+            removed = 0
+            for row in rows:
+                if row < len(self.rows) and self.rows[row] is not None:
+                    record = {'op': 'delete', 'row': row, 'deleted': time.time()}
+                    self.append_record(record)
+                    self.apply(record)
+                    removed += 1
+
+            if removed and self.deleted > self.compact_ratio * max(1, len(self.rows)):
+                self.compact()
+        return removed
+
+    def compact(self):
+        """Rewrite the matrix and index without tombstoned rows"""
+        with self.locked():
+            live = [row for row, meta in enumerate(self.rows) if meta is not None]
+            capacity = max(self.initial_capacity, len(live))
+
+            temp_matrix = self.matrix_path + '.tmp'
+            compacted = self.create_matrix(temp_matrix, capacity)
+            compacted[:len(live)] = self.matrix[live]
+            compacted.flush()
+            del compacted
+
+            temp_index = self.index_path + '.tmp'
+            with open(temp_index, 'w', encoding='utf-8') as f:
+                for new_row, old_row in enumerate(live):
+                    record = {'op': 'add', 'row': new_row}
+                    record.update(self.rows[old_row])
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.matrix = None
+            os.replace(temp_matrix, self.matrix_path)
+            os.replace(temp_index, self.index_path)
+            self.open()
+        print(f"Compacted authorized user store to {len(live)} users")
+
+    def __len__(self):
+        return len(self.rows) - self.deleted
+
+    def names(self):
+        return [meta['name'] for meta in self.rows if meta is not None]
+
+    def metadata(self):
+        """(row, metadata) for every live user"""
+        return [(row, meta) for row, meta in enumerate(self.rows) if meta is not None]
+
+    def encodings(self):
+        """Encodings of all live users as a float32 array"""
+        live = [row for row, meta in enumerate(self.rows) if meta is not None]
+        if len(live) == len(self.rows):
+            return self.matrix[:len(live)]
+        return self.matrix[live]
+
+    def migrate_pickle(self, pickle_path):
+        """Import an old authorized_users.pkl once, then rename it out of the way"""
+        with self.locked():
+            if not os.path.exists(pickle_path) or len(self.rows):
+                return 0
+            with open(pickle_path, 'rb') as f:
+                data = pickle.load(f)
+            for name, encoding in zip(data['names'], data['encodings']):
+                self.add(name, encoding, source='pickle')
+            os.replace(pickle_path, pickle_path + '.migrated')
+        print(f"Migrated {len(data['names'])} authorized users from {os.path.basename(pickle_path)}")
+        return len(data['names'])
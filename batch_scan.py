@@ -0,0 +1,361 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+from camera_sources import IMAGE_EXTENSIONS
+from detections import boxes_to_detections
+from detector_backends import BACKENDS, load_detector, prepare_model
+from enhanced_farm_security_system import CONFIDENCE_THRESHOLD, TARGET_CLASSES
+from tracker import IoUTracker
+
+CHECKPOINT_NAME = 'chunks.jsonl'
+DETECTION_FIELDS = ('source', 'frame', 'time', 'class', 'type', 'confidence', 'x1', 'y1', 'x2', 'y2', 'object')
+OBJECT_FIELDS = ('source', 'object', 'class', 'type', 'first_seen', 'last_seen', 'detections',
+                 'max_confidence', 'keyframe')
+
+
+def list_images(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def plan_chunks(inputs, chunk_seconds=60.0, scan_fps=5.0, chunk_images=200):
+    """Split videos into chunks of `chunk_seconds` and image folders into `chunk_images` files.
+
+    Every chunk has a stable id, so an interrupted scan can skip the chunks it finished.
+    """
+    chunks = []
+    for path in inputs:
+        if os.path.isdir(path) or path.lower().endswith(IMAGE_EXTENSIONS):
+            images = list_images(path) if os.path.isdir(path) else [path]
+            for start in range(0, len(images), chunk_images):
+                chunks.append({'id': f"{path}#{start}", 'source': path, 'kind': 'images', 'start': start,
+                               'paths': images[start:start + chunk_images]})
+            continue
+
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            print(f"Error: Could not open {path}, skipping it")
+            continue
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+        # Analyse every stride-th frame; the others are only grabbed, not decoded
+        stride = max(1, round(fps / scan_fps)) if scan_fps else 1
+        chunk_frames = max(stride, int(chunk_seconds * fps) // stride * stride)
+        if frame_count <= 0:
+            # Unknown length: one chunk read to the end
+            chunks.append({'id': f"{path}#0", 'source': path, 'kind': 'video', 'start': 0, 'end': None,
+                           'fps': fps, 'stride': stride})
+            continue
+        for start in range(0, frame_count, chunk_frames):
+            chunks.append({'id': f"{path}#{start}", 'source': path, 'kind': 'video', 'start': start,
+                           'end': start + chunk_frames, 'fps': fps, 'stride': stride})
+    return chunks
+
+
+def read_chunk(chunk):
+    """Yield (frame number, seconds into the source, image) for the frames of a chunk to analyse"""
+    if chunk['kind'] == 'images':
+        for offset, path in enumerate(chunk['paths']):
+            image = cv2.imread(path)
+            if image is not None:
+                yield chunk['start'] + offset, float(chunk['start'] + offset), image
+        return
+
+    capture = cv2.VideoCapture(chunk['source'])
+    try:
+        if chunk['start']:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, chunk['start'])
+        index = chunk['start']
+        while chunk['end'] is None or index < chunk['end']:
+            if index % chunk['stride']:
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield index, index / chunk['fps'], frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def draw_detections(frame, detections, object_ids):
+    for (cls_id, conf, x1, y1, x2, y2, _, _, _), object_id in zip(detections.tolist(), object_ids):
+        label = f"{TARGET_CLASSES[cls_id]['name']} #{object_id} {conf:.2f}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+
+
+# Per worker process state, set up once by init_worker
+worker = {}
+
+
+def init_worker(model_path, config):
+    if config.get('threads'):
+        try:
+            import torch
+            torch.set_num_threads(config['threads'])
+        except ImportError:
+            pass
+    worker['model'] = load_detector(model_path)
+    worker['config'] = config
+
+
+def scan_chunk(chunk):
+    """Worker: detect on a chunk with batched model calls, track objects and save keyframes.
+
+    Objects are tracked like the live system does; a keyframe is saved whenever new
+    objects appear, the frames the live system would have alerted on.
+    """
+    model, config = worker['model'], worker['config']
+    class_ids = sorted(TARGET_CLASSES)
+    tracker = IoUTracker(config['iou_threshold'], config['max_missed'])
+    stem = os.path.splitext(os.path.basename(chunk['source'].rstrip(os.sep)))[0]
+    prefix = f"{chunk['start']}-"  # Object ids are per chunk, keep them apart in the report
+    detections_out, objects = [], {}
+    frames = 0
+
+    def process(batch):
+        nonlocal frames
+        results = model([image for _, _, image in batch], classes=class_ids, imgsz=config['imgsz'],
+                        conf=config['conf'], verbose=False)
+        for (index, seconds, image), result in zip(batch, results):
+            frames += 1
+            detections = boxes_to_detections(result.boxes, class_ids, config['conf'])
+            track_ids, entered, _ = tracker.update(detections, seconds)
+            object_ids = [prefix + str(track_id) for track_id in track_ids.tolist()]
+            for (cls_id, conf, x1, y1, x2, y2, _, _, _), object_id in zip(detections.tolist(), object_ids):
+                info = TARGET_CLASSES[cls_id]
+                detections_out.append([chunk['source'], index, round(seconds, 3), info['name'], info['type'],
+                                       round(conf, 3), x1, y1, x2, y2, object_id])
+                found = objects.setdefault(object_id, {
+                    'source': chunk['source'], 'object': object_id, 'class': info['name'],
+                    'type': info['type'], 'first_seen': round(seconds, 3), 'detections': 0,
+                    'max_confidence': 0.0, 'keyframe': None})
+                found['last_seen'] = round(seconds, 3)
+                found['detections'] += 1
+                found['max_confidence'] = max(found['max_confidence'], round(conf, 3))
+
+            if entered:
+                classes = "-".join(sorted({TARGET_CLASSES[track.cls_id]['name'] for track in entered}))
+                keyframe = os.path.join(config['keyframe_dir'], f"{stem}_{index:07d}_{classes}.jpg")
+                draw_detections(image, detections, object_ids)
+                cv2.imwrite(keyframe, image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                for track in entered:
+                    objects[prefix + str(track.track_id)]['keyframe'] = keyframe
+
+    batch = []
+    for item in read_chunk(chunk):
+        batch.append(item)
+        if len(batch) >= config['batch_size']:
+            process(batch)
+            batch = []
+    if batch:
+        process(batch)
+
+    # Footage covered: every analysed frame stands for `stride` frames of video
+    covered = frames * chunk['stride'] / chunk['fps'] if chunk['kind'] == 'video' else 0.0
+    return {'id': chunk['id'], 'source': chunk['source'], 'frames': frames, 'seconds': covered,
+            'detections': detections_out, 'objects': list(objects.values())}
+
+
+def failed_chunk(chunk, error):
+    """Checkpoint entry for a chunk that could not be scanned; it is tried again on resume"""
+    return {'id': chunk['id'], 'source': chunk['source'], 'error': f"{type(error).__name__}: {error}",
+            'frames': 0, 'seconds': 0.0, 'detections': [], 'objects': []}
+
+
+def load_checkpoint(path):
+    """Results of the chunks finished so far; a line cut short by an interruption is ignored.
+
+    The latest line of a chunk wins, so a chunk that failed and then succeeded counts as done.
+    """
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done[result['id']] = result
+    return done
+
+
+def write_report(output_dir, results, scanned, elapsed, failed=()):
+    """detections.csv, objects.csv and a report.json summary from the chunk results.
+
+    Speed is measured over the `scanned` results of this run, which took `elapsed` seconds.
+    `failed` lists the checkpoint entries of chunks that could not be scanned.
+    """
+    with open(os.path.join(output_dir, 'detections.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(DETECTION_FIELDS)
+        for result in results:
+            writer.writerows(result['detections'])
+    with open(os.path.join(output_dir, 'objects.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, OBJECT_FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerows(result['objects'])
+
+    sources = {}
+    for result in results:
+        source = sources.setdefault(result['source'], {'frames': 0, 'seconds': 0.0, 'objects': Counter()})
+        source['frames'] += result['frames']
+        source['seconds'] += result['seconds']
+        source['objects'].update(found['class'] for found in result['objects'])
+    scanned_frames = sum(result['frames'] for result in scanned)
+    scanned_seconds = sum(result['seconds'] for result in scanned)
+    report = {
+        'chunks': len(results),
+        'frames_analysed': sum(source['frames'] for source in sources.values()),
+        'footage_seconds': round(sum(source['seconds'] for source in sources.values()), 1),
+        'this_run': {
+            'chunks': len(scanned),
+            'frames_analysed': scanned_frames,
+            'footage_seconds': round(scanned_seconds, 1),
+            'scan_seconds': round(elapsed, 1),
+            'frames_per_second': round(scanned_frames / elapsed, 1) if elapsed else None,
+            'speed_vs_real_time': round(scanned_seconds / elapsed, 1) if elapsed and scanned_seconds else None,
+        },
+        'failed_chunks': [{'id': result['id'], 'source': result['source'], 'error': result['error']}
+                          for result in failed],
+        'objects': dict(sum((source['objects'] for source in sources.values()), Counter())),
+        'sources': {path: {**source, 'seconds': round(source['seconds'], 1), 'objects': dict(source['objects'])}
+                    for path, source in sources.items()},
+    }
+    with open(os.path.join(output_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def run_scan(inputs, output_dir, workers=None, batch_size=8, scan_fps=5.0, chunk_seconds=60.0,
+             model_path='yolov8n.pt', backend='torch', int8=False, imgsz=640, calibration_dir=None):
+    """Scan recorded footage with a pool of detector processes, resuming a previous run in output_dir.
+
+    Returns the report summary, or None if the scan was interrupted.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    keyframe_dir = os.path.join(output_dir, 'keyframes')
+    os.makedirs(keyframe_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+
+    chunks = plan_chunks(inputs, chunk_seconds, scan_fps)
+    done = load_checkpoint(checkpoint_path)
+    pending = [chunk for chunk in chunks if chunk['id'] not in done or 'error' in done[chunk['id']]]
+    print(f"{len(chunks)} chunks, {len(chunks) - len(pending)} already done, scanning {len(pending)} "
+          f"with {workers} worker(s)")
+
+    model_path, backend = prepare_model(model_path, backend, int8, calibration_dir, imgsz)
+    config = {
+        'conf': CONFIDENCE_THRESHOLD,
+        'imgsz': imgsz,
+        'batch_size': batch_size,
+        'iou_threshold': 0.3,
+        'max_missed': 5,
+        'keyframe_dir': keyframe_dir,
+        'threads': max(1, (os.cpu_count() or 1) // workers),
+    }
+
+    start = time.monotonic()
+    scanned = []
+    context = multiprocessing.get_context('spawn')
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                   initargs=(model_path, config))
+    try:
+        with open(checkpoint_path, 'a') as checkpoint:
+            # Keep only a few chunks per worker in flight so an interruption loses little work
+            queued = iter(pending)
+            running = {}  # Future -> chunk
+            broken = False
+            while True:
+                while not broken and len(running) < workers * 2:
+                    chunk = next(queued, None)
+                    if chunk is None:
+                        break
+                    try:
+                        running[executor.submit(scan_chunk, chunk)] = chunk
+                    except BrokenProcessPool:
+                        broken = True
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        # A worker died (out of memory, a crashing decoder): the pool takes no more work
+                        broken = True
+                        result = failed_chunk(chunk, e)
+                    except Exception as e:
+                        result = failed_chunk(chunk, e)
+                    checkpoint.write(json.dumps(result) + '\n')
+                    checkpoint.flush()
+                    done[result['id']] = result
+                    if 'error' in result:
+                        print(f"[{len(done)}/{len(chunks)}] {result['id']} failed: {result['error']}")
+                        continue
+                    scanned.append(result)
+                    print(f"[{len(done)}/{len(chunks)}] {result['id']}: {result['frames']} frames, "
+                          f"{len(result['objects'])} objects")
+    except KeyboardInterrupt:
+        print("Interrupted, run the same command again to resume")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return None
+    except BaseException:
+        # Don't leave queued chunks running behind an unexpected error
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+    if broken:
+        print("A worker process died, the chunks not scanned yet are left for the next run")
+
+    results = [done[chunk['id']] for chunk in chunks if chunk['id'] in done]
+    return write_report(output_dir, [result for result in results if 'error' not in result],
+                        scanned, time.monotonic() - start, [result for result in results if 'error' in result])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan recorded videos or image folders for farm intruders")
+    parser.add_argument('inputs', nargs='+', help="Video files, image files or folders of images")
+    parser.add_argument('--output', default='scan_report', help="Report directory, also used to resume")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Detector processes (default half the CPU cores)")
+    parser.add_argument('--batch', type=int, default=8, help="Frames per model call")
+    parser.add_argument('--fps', type=float, default=5.0,
+                        help="Video frames analysed per second of footage (0 = every frame)")
+    parser.add_argument('--chunk-seconds', type=float, default=60.0, help="Length of a video chunk")
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLOv8 weights (default yolov8n.pt)")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch', help="Detector runtime")
+    parser.add_argument('--int8', action='store_true', help="Use the int8 quantized export")
+    parser.add_argument('--imgsz', type=int, default=640, help="YOLO input size")
+    parser.add_argument('--calibration-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  'detected_images'),
+                        help="Stored detection images used for int8 calibration")
+    args = parser.parse_args()
+
+    report = run_scan(args.inputs, args.output, args.workers, args.batch, args.fps, args.chunk_seconds,
+                      args.model, args.backend, args.int8, args.imgsz, args.calibration_dir)
+    if report is None:
+        exit(1)
+    run = report['this_run']
+    print(f"Scanned {run['footage_seconds']:.0f}s of footage ({run['frames_analysed']} frames) "
+          f"in {run['scan_seconds']:.0f}s, {run['speed_vs_real_time'] or '-'}x real time")
+    print("Objects found: " + (", ".join(f"{name} {count}" for name, count in report['objects'].items()) or "none"))
+    print(f"Report written to {args.output}")
+    if report['failed_chunks']:
+        print(f"{len(report['failed_chunks'])} chunks failed (listed in report.json), run again to retry them")
+        exit(1)
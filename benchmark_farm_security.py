@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from camera_sources import open_source, parse_source
+from detections import box_iou, boxes_to_detections, detection_boxes
+from detector_backends import BACKENDS, load_detector, prepare_model
+from enhanced_farm_security_system import CONFIDENCE_THRESHOLD, TARGET_CLASSES, EnhancedFarmSecuritySystem
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it can't be measured"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(sources, motion_gate=True, face_recognition=True, processes=0, backend='torch', int8=False,
+                  model_path='yolov8n.pt'):
+    """Replay the sources through the full pipeline without a window and return a report"""
+    with tempfile.TemporaryDirectory(prefix='farm_benchmark_') as save_dir:
+        system = EnhancedFarmSecuritySystem(sources=sources, display=False, save_dir=save_dir,
+                                            lossless=True, processes=processes, model_path=model_path,
+                                            backend=backend, int8=int8)
+        system.motion_gate_enabled = motion_gate
+        system.face_recognition_enabled = face_recognition
+        system.stats_interval = float('inf')
+
+        start = time.perf_counter()
+        system.run()
+        elapsed = time.perf_counter() - start
+
+        return {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'sources': [str(source) for source in sources],
+            'motion_gate': motion_gate,
+            'face_recognition': face_recognition,
+            'processes': processes,
+            'backend': system.backend,
+            'frames': system.frames_processed,
+            'elapsed_s': round(elapsed, 3),
+            'fps': round(system.frames_processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'saved_images': system.writer.written,
+            'stages': system.latency.report(),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def compare(report, baseline, max_regression, min_delta_ms=0.5):
+    """Print the change against a previous report; return False if FPS or a stage got too much slower"""
+    ok = True
+    fps_change = (report['fps'] - baseline['fps']) / baseline['fps'] if baseline.get('fps') else 0.0
+    print(f"FPS: {baseline.get('fps')} -> {report['fps']} ({fps_change:+.1%})")
+    if fps_change < -max_regression:
+        ok = False
+
+    for stage, stats in report['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old or not old.get('p50_ms'):
+            continue
+        change = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms']
+        flag = ""
+        # Sub-millisecond stages are too noisy to judge by ratio alone
+        if change > max_regression and stats['p50_ms'] - old['p50_ms'] > min_delta_ms:
+            flag = "  <-- regression"
+            ok = False
+        print(f"  {stage:12s} p50 {old['p50_ms']:8.2f} -> {stats['p50_ms']:8.2f} ms ({change:+.1%}){flag}")
+    return ok
+
+
+def read_frames(sources, max_frames):
+    """Read up to max_frames frames from each replay source"""
+    frames = []
+    for source in sources:
+        reader = open_source(parse_source(source))
+        for _ in range(max_frames):
+            ret, frame = reader.read()
+            if not ret:
+                break
+            frames.append(frame)
+        reader.release()
+    return frames
+
+
+def average_precision(reference, candidate, iou_threshold=0.5):
+    """mAP of one backend's detections, taking the reference backend's detections as ground truth"""
+    classes = sorted(set(cls_id for detections in reference for cls_id in detections['cls'].tolist()))
+    if not classes:
+        return 1.0 if not any(len(detections) for detections in candidate) else 0.0
+
+    precisions = []
+    for cls_id in classes:
+        truth = [detections[detections['cls'] == cls_id] for detections in reference]
+        matched = [np.zeros(len(boxes), dtype=bool) for boxes in truth]
+        total = sum(len(boxes) for boxes in truth)
+
+        # Most confident predictions claim their best unmatched reference box first
+        predictions = [(conf, index, box) for index, detections in enumerate(candidate)
+                       for conf, box in zip(detections['conf'][detections['cls'] == cls_id].tolist(),
+                                            detection_boxes(detections[detections['cls'] == cls_id]))]
+        predictions.sort(key=lambda prediction: -prediction[0])
+        hits = np.zeros(len(predictions))
+        for rank, (_, index, box) in enumerate(predictions):
+            if not len(truth[index]):
+                continue
+            overlaps = box_iou(box, detection_boxes(truth[index]))[0]
+            overlaps[matched[index]] = 0
+            best = int(np.argmax(overlaps))
+            if overlaps[best] >= iou_threshold:
+                matched[index][best] = True
+                hits[rank] = 1
+
+        # Area under the interpolated precision/recall curve
+        true_positives = np.cumsum(hits)
+        recall = np.concatenate(([0.0], true_positives / total, [1.0]))
+        precision = np.concatenate(([1.0], true_positives / np.arange(1, len(hits) + 1), [0.0]))
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        precisions.append(float(np.sum((recall[1:] - recall[:-1]) * precision[1:])))
+    return float(np.mean(precisions))
+
+
+def compare_backends(sources, backends, model_path='yolov8n.pt', int8=False, calibration_dir=None, max_frames=300,
+                     imgsz=640):
+    """Run the same replay frames through PyTorch and each backend; report latency and mAP drift.
+
+    Only the detector is timed: the model is loaded on its own and called the way the
+    system's detection stage calls it, without cameras, alerts or storage.
+    """
+    frames = read_frames(sources, max_frames)
+    print(f"Comparing detector backends on {len(frames)} frames")
+    class_ids = sorted(TARGET_CLASSES)
+
+    results = []
+    reference = None
+    for backend in ['torch'] + [backend for backend in backends if backend != 'torch']:
+        quantize = int8 and backend != 'torch'
+        # Export and calibrate on the real detection images; later runs reuse the export
+        detector_path, actual_backend = prepare_model(model_path, backend, quantize, calibration_dir, imgsz)
+        model = load_detector(detector_path)
+        model(np.zeros((480, 640, 3), dtype=np.uint8), classes=class_ids, verbose=False)  # Warm-up
+
+        detections = []
+        latencies = []
+        for frame in frames:
+            start = time.perf_counter()
+            result = model(frame, classes=class_ids, imgsz=imgsz, conf=CONFIDENCE_THRESHOLD, verbose=False)[0]
+            detections.append(boxes_to_detections(result.boxes, class_ids, CONFIDENCE_THRESHOLD))
+            latencies.append((time.perf_counter() - start) * 1000)
+        del model
+
+        if reference is None:
+            reference = detections
+        latencies = np.array(latencies) if latencies else np.zeros(1)
+        results.append({
+            'requested': backend,
+            'backend': actual_backend,
+            'int8': quantize and actual_backend != 'torch',
+            'model': detector_path,
+            'mean_ms': round(float(latencies.mean()), 2),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p90_ms': round(float(np.percentile(latencies, 90)), 2),
+            'detections': int(sum(len(found) for found in detections)),
+            'map50': round(average_precision(reference, detections, 0.5), 4),
+            'map50_95': round(float(np.mean([average_precision(reference, detections, threshold)
+                                             for threshold in np.arange(0.5, 0.96, 0.05)])), 4),
+        })
+
+    baseline = results[0]['mean_ms']
+    print(f"{'backend':10s} {'int8':>5s} {'mean':>8s} {'p50':>8s} {'p90':>8s} {'speedup':>8s} "
+          f"{'mAP50':>7s} {'mAP50-95':>9s} {'dets':>6s}")
+    for result in results:
+        speedup = baseline / result['mean_ms'] if result['mean_ms'] else 0.0
+        # A backend whose runtime is missing shows up as e.g. "onnx>torch"
+        name = result['backend'] if result['backend'] == result['requested'] else \
+            f"{result['requested']}>{result['backend']}"
+        print(f"{name:10s} {str(result['int8']):>5s} {result['mean_ms']:8.2f} {result['p50_ms']:8.2f} "
+              f"{result['p90_ms']:8.2f} {speedup:7.2f}x {result['map50']:7.3f} {result['map50_95']:9.3f} "
+              f"{result['detections']:6d}")
+    return results
+
+
+def print_report(report):
+    print(f"\n{report['frames']} frames in {report['elapsed_s']}s = {report['fps']} FPS, "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    print(f"{'stage':12s} {'count':>7s} {'mean':>8s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>8s}  (ms)")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:12s} {stats['count']:7d} {stats['mean_ms']:8.2f} {stats['p50_ms']:8.2f} "
+              f"{stats['p90_ms']:8.2f} {stats['p99_ms']:8.2f} {stats['max_ms']:8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay fixed footage through the detection loop and time every stage")
+    parser.add_argument('--source', action='append', dest='sources',
+                        help="Video file, image folder or synthetic spec (default: synthetic:frames=300)")
+    parser.add_argument('--no-motion-gate', action='store_true', help="Run YOLO on every frame")
+    parser.add_argument('--no-face', action='store_true', help="Disable face recognition")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="Detection worker processes (default 0 = single process)")
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLOv8 weights (default yolov8n.pt)")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch', help="Detector backend for the replay")
+    parser.add_argument('--int8', action='store_true', help="Use the int8-quantized export of the backend")
+    parser.add_argument('--compare-backends', metavar='BACKEND', nargs='+', choices=BACKENDS,
+                        help="Instead of a pipeline run, compare these backends with PyTorch "
+                             "(latency and mAP drift on the same frames)")
+    parser.add_argument('--calibration-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  'detected_images'),
+                        help="Stored detection images used for int8 calibration")
+    parser.add_argument('--max-frames', type=int, default=300,
+                        help="Frames per source for --compare-backends (default 300)")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--compare', help="Previous JSON report to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help="Allowed slowdown before --compare fails (default 0.10 = 10%%)")
+    args = parser.parse_args()
+    sources = args.sources or ['synthetic:frames=300']
+
+    if args.compare_backends:
+        results = compare_backends(sources, args.compare_backends, args.model, args.int8,
+                                   args.calibration_dir, args.max_frames)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Report written to {args.output}")
+        sys.exit(0)
+
+    if args.int8 and args.backend != 'torch':
+        prepare_model(args.model, args.backend, True, args.calibration_dir)
+    report = run_benchmark(sources,
+                           motion_gate=not args.no_motion_gate,
+                           face_recognition=not args.no_face,
+                           processes=args.processes,
+                           backend=args.backend, int8=args.int8, model_path=args.model)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.max_regression):
+            print("Performance regression detected")
+            sys.exit(1)
@@ -0,0 +1,165 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from authorized_user_store import AuthorizedUserStore
+from camera_sources import IMAGE_EXTENSIONS
+
+
+def find_photos(root):
+    """Return (name, path) for every photo: one folder per person, or loose files named after the person"""
+    photos = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            relative = os.path.relpath(path, root)
+            parts = relative.split(os.sep)
+            # Photos directly in the root (like the webcam crops) are named after the file
+            name = parts[0] if len(parts) > 1 else os.path.splitext(filename)[0]
+            photos.append((name, path))
+    return photos
+
+
+def file_hash(path):
+    """SHA-256 of the file contents, so renamed photos are not encoded twice"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_photo(path, max_side=1024):
+    """Worker: return the encoding of the largest face in a photo, or None"""
+    # Imported here so the parent process stays light and each worker loads dlib once
+    import cv2
+    import face_recognition
+
+    image = face_recognition.load_image_file(path)
+
+    # Large phone photos are shrunk first, HOG time grows with the pixel count
+    scale = max_side / max(image.shape[:2])
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    face_locations = face_recognition.face_locations(image)
+    if not face_locations:
+        return None
+
+    largest = max(face_locations, key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]))
+    encoding = face_recognition.face_encodings(image, [largest])[0]
+    return [float(value) for value in encoding]
+
+
+def load_cache(cache_path):
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError as e:
+            print(f"Ignoring unreadable encoding cache: {e}")
+    return {}
+
+
+def save_cache(cache, cache_path):
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, cache_path)
+
+
+def enroll_directory(root, store, cache_path, workers=None):
+    """Encode every new or changed photo under root and merge the results into the store.
+
+    The folder is the source of truth for bulk enrolled users: photos that were removed
+    from it are removed from the store too. Users added from the webcam are left alone.
+    Safe to run while the live system is using the same store.
+    """
+    start = time.time()
+    photos = find_photos(root)
+    print(f"Found {len(photos)} photos of {len(set(name for name, _ in photos))} people in {root}")
+
+    # Encodings are cached by content hash, so re-runs only process new or changed photos
+    cache = load_cache(cache_path)
+    hashes = {path: file_hash(path) for _, path in photos}
+    todo = sorted(set(digest for digest in hashes.values() if digest not in cache))
+    paths_by_hash = {digest: path for path, digest in hashes.items()}
+
+    # Failed photos are not cached, so the next run tries them again
+    failed = set()
+    if todo:
+        print(f"Encoding {len(todo)} new or changed photos with {workers or os.cpu_count()} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(encode_photo, paths_by_hash[digest]): digest for digest in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                digest = futures[future]
+                try:
+                    cache[digest] = future.result()
+                except Exception as e:
+                    print(f"Error encoding {paths_by_hash[digest]}: {e}")
+                    failed.add(digest)
+                    continue
+                if done % 50 == 0 or done == len(todo):
+                    print(f"  {done}/{len(todo)} photos encoded")
+        save_cache(cache, cache_path)
+
+    # Merge into the store: skip photos already enrolled, replace photos that changed and
+    # remove photos that are gone. The live system may be writing to the store as well, so
+    # the rows are read and changed under the store lock
+    added = 0
+    replaced = []
+    no_face = 0
+    with store.locked():
+        enrolled = {meta['image']: (row, meta.get('sha256')) for row, meta in store.metadata()
+                    if meta.get('source') == 'bulk' and 'image' in meta}
+        images = set()
+        for name, path in photos:
+            digest = hashes[path]
+            image = os.path.relpath(path, root)
+            images.add(image)
+            if digest in failed:
+                continue  # An enrolled photo that changed keeps its old encoding until it encodes
+            if image in enrolled:
+                row, old_digest = enrolled[image]
+                if old_digest == digest:
+                    continue
+                replaced.append(row)
+
+            encoding = cache.get(digest)
+            if encoding is None:
+                no_face += 1
+                continue
+            store.add(name, np.asarray(encoding, dtype=np.float32), source='bulk', image=image, sha256=digest)
+            added += 1
+
+        removed = [row for image, (row, _) in enrolled.items() if image not in images]
+        if replaced or removed:
+            store.delete_rows(replaced + removed)
+
+    print(f"Enrollment finished in {time.time() - start:.1f}s: {added} added, {len(replaced)} replaced, "
+          f"{len(removed)} removed, {no_face} photos without a face, {len(failed)} failed, "
+          f"{len(store)} face encodings in store")
+    return added
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Enroll authorized users from a folder of photos")
+    parser.add_argument('directory', nargs='?', default=os.path.join(current_dir, 'authorized_users'),
+                        help="Folder with one sub-folder of photos per person")
+    parser.add_argument('--store', default=os.path.join(current_dir, 'authorized_store'),
+                        help="Authorized user store directory")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    user_store = AuthorizedUserStore(args.store)
+    user_store.migrate_pickle(os.path.join(current_dir, 'authorized_users.pkl'))
+    enroll_directory(args.directory, user_store, os.path.join(args.store, 'enroll_cache.json'), args.workers)
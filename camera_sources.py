@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from frame_pipeline import DropOldestQueue, StageStats
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+STREAM_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://')
+
+
+def parse_source(value):
+    """Turn a command-line source into a device index, or keep it as a file path / URL"""
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    return value
+
+
+class ImageDirectoryReader:
+    """Frame reader that replays the images of a folder in name order"""
+
+    def __init__(self, directory):
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.position = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def get(self, prop):
+        """Frame width and height come from the first image, like VideoCapture reports them"""
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT) and self.paths:
+            if not hasattr(self, 'first_shape'):
+                first = cv2.imread(self.paths[0])
+                self.first_shape = first.shape if first is not None else (0, 0)
+            return self.first_shape[1] if prop == cv2.CAP_PROP_FRAME_WIDTH else self.first_shape[0]
+        return 0
+
+    def read(self):
+        while self.position < len(self.paths):
+            frame = cv2.imread(self.paths[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.position = len(self.paths)
+
+
+class SyntheticReader:
+    """Frame reader that generates reproducible frames with moving blobs, for tests and benchmarks.
+
+    Configured as "synthetic:frames=300,width=640,height=480,objects=3,seed=0".
+    """
+
+    def __init__(self, frames=300, width=640, height=480, objects=3, seed=0):
+        self.frames = frames
+        self.width = width
+        self.height = height
+        self.position = 0
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+        self.starts = rng.uniform(0, 1, (objects, 2)) * (width, height)
+        self.velocities = rng.uniform(-4, 4, (objects, 2))
+        self.colors = rng.integers(0, 256, (objects, 3)).tolist()
+
+    @classmethod
+    def from_spec(cls, spec):
+        options = {}
+        if ':' in spec:
+            for part in spec.split(':', 1)[1].split(','):
+                if '=' in part:
+                    key, value = part.split('=', 1)
+                    options[key.strip()] = int(value)
+        return cls(**options)
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+
+    def read(self):
+        if self.position >= self.frames:
+            return False, None
+        frame = self.background.copy()
+        positions = self.starts + self.velocities * self.position
+        for (x, y), color in zip(positions, self.colors):
+            x, y = int(x) % self.width, int(y) % self.height
+            cv2.rectangle(frame, (x, y), (x + 40, y + 30), color, -1)
+        self.position += 1
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.position = self.frames
+
+
+def open_source(source):
+    """Open a device index, video file, stream URL, image folder or synthetic generator"""
+    if isinstance(source, str):
+        if source.startswith('synthetic'):
+            return SyntheticReader.from_spec(source)
+        if os.path.isdir(source):
+            return ImageDirectoryReader(source)
+    return cv2.VideoCapture(source)
+
+
+class CameraSource:
+    """One configured video source with its own capture thread and frame queue"""
+
+    def __init__(self, name, source, width=640, height=480, queue_size=2, condition=None,
+                 lossless=False, latency=None, reconnect=False):
+        self.name = name
+        self.source = parse_source(source)
+        self.width = width
+        self.height = height
+        self.reconnect = reconnect  # Reopen live cameras and streams that stop delivering frames
+        self.cap = open_source(self.source)
+        self.lock = threading.Lock()
+        self.paused = threading.Event()
+        self.queue = DropOldestQueue(queue_size, condition, block=lossless)
+        self.stats = StageStats(f'capture[{name}]')
+        self.latency = latency
+
+        # Only live webcams are mirrored, recorded files and streams are shown as-is
+        self.mirror = isinstance(self.source, int)
+
+        self.configure()
+
+    def configure(self):
+        if self.cap.isOpened() and isinstance(self.source, int):
+            # Set the resolution
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+            # Keep the driver buffer short so we always read a recent frame
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def frame_size(self):
+        """(width, height) of the frames this source delivers, or the requested size if it won't say"""
+        with self.lock:
+            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width and height:
+            return width, height
+        return self.width, self.height
+
+    def is_live(self):
+        """Webcams and network streams can come back; files and generators just end"""
+        return isinstance(self.source, int) or (
+            isinstance(self.source, str) and self.source.lower().startswith(STREAM_PREFIXES))
+
+    def reopen(self, stop_event, max_delay=30.0):
+        """Try to reopen the source with growing delays; return False if asked to stop first"""
+        delay = 1.0
+        while not stop_event.is_set():
+            print(f"[{self.name}] Camera lost, reconnecting in {delay:.0f}s...")
+            stop_event.wait(delay)
+            with self.lock:
+                self.cap.release()
+                self.cap = open_source(self.source)
+                self.configure()
+                if self.cap.isOpened():
+                    print(f"[{self.name}] Camera reconnected")
+                    return True
+            delay = min(max_delay, delay * 2)
+        return False
+
+    def read(self):
+        """Read one frame while holding the capture lock"""
+        with self.lock:
+            return self.cap.read()
+
+    def capture_loop(self, stop_event):
+        """Capture stage: read frames from this source as fast as it delivers them"""
+        while not stop_event.is_set():
+            # Let the registration mode use the camera exclusively
+            if self.paused.is_set():
+                time.sleep(0.05)
+                continue
+
+            start = time.monotonic()
+            ret, frame = self.read()
+
+            if not ret:
+                if self.reconnect and self.is_live() and self.reopen(stop_event):
+                    continue
+                print(f"[{self.name}] Failed to grab frame")
+                break
+
+            # Mirror the frame (flip horizontally for more natural view)
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+            elapsed = time.monotonic() - start
+            self.stats.record(elapsed)
+            if self.latency is not None:
+                self.latency.record('capture', elapsed)
+            self.queue.put((time.monotonic(), frame))
+
+        self.queue.close()
+
+    def release(self):
+        self.cap.release()
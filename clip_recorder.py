@@ -0,0 +1,204 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from detection_writer import timestamped_name
+
+
+class Clip:
+    """One event clip being collected: frames from `start` to `end` (monotonic seconds)"""
+
+    def __init__(self, camera_name, label, start, end):
+        self.camera_name = camera_name
+        self.labels = [label]
+        self.start = start
+        self.end = end
+        self.created = datetime.now()
+        self.frames = []  # (timestamp, JPEG bytes)
+        self.bytes = 0
+
+    def add(self, timestamp, jpeg):
+        self.frames.append((timestamp, jpeg))
+        self.bytes += len(jpeg)
+
+
+class ClipRecorder:
+    """Keeps a few seconds of JPEG-compressed frames per camera and writes clips around events.
+
+    Frames are compressed and clips encoded on background threads; the render loop only
+    copies a frame into a short queue. Memory is bounded by `max_buffer_bytes` for the
+    pre-event buffers of all cameras plus `max_clip_bytes` for each clip being collected.
+    """
+
+    def __init__(self, save_dir, pre_seconds=5.0, post_seconds=10.0, max_buffer_bytes=32 << 20,
+                 max_clip_bytes=32 << 20, fps=10.0, jpeg_quality=70, max_width=1280, max_pending=4,
+                 on_written=None):
+        self.save_dir = save_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_clip_bytes = max_clip_bytes  # A longer clip is split so it can't grow without bound
+        self.fps = fps  # Frames per second kept, whatever the camera delivers
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width  # Larger frames (tiled mode) are shrunk before compression
+        self.on_written = on_written  # Called with the path of each finished clip (disk retention)
+
+        self.pending = queue.Queue(maxsize=max_pending)  # Raw frames waiting to be compressed
+        self.finished = queue.Queue()  # Clips waiting to be encoded to video
+        self.buffers = {}  # Camera name -> deque of (timestamp, JPEG bytes)
+        self.buffer_bytes = {}
+        self.clips = {}  # Camera name -> clip still collecting frames
+        self.last_added = {}
+        self.sequence = itertools.count(1)  # Keeps clip names unique within the same millisecond
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.written = 0
+        self.failed = 0
+        self.merged = 0
+        self.dropped = 0
+
+        os.makedirs(save_dir, exist_ok=True)
+        self.threads = [threading.Thread(target=self.compress_loop, name='clip-compress', daemon=True),
+                        threading.Thread(target=self.write_loop, name='clip-writer', daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def add(self, camera_name, frame, now=None):
+        """Offer a rendered frame; it is copied and compressed later, at most `fps` times a second"""
+        if now is None:
+            now = time.monotonic()
+        if now - self.last_added.get(camera_name, float('-inf')) < 1.0 / self.fps:
+            return
+        self.last_added[camera_name] = now
+        try:
+            self.pending.put_nowait((camera_name, now, frame.copy()))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def trigger(self, camera_name, label, now=None):
+        """Start a clip around an event, or extend the camera's current clip if they overlap"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            clip = self.clips.get(camera_name)
+            if clip is not None and now - self.pre_seconds <= clip.end:
+                clip.end = max(clip.end, now + self.post_seconds)
+                if label not in clip.labels:
+                    clip.labels.append(label)
+                self.merged += 1
+                return
+            if clip is not None:
+                self.finished.put(self.clips.pop(camera_name))
+
+            clip = Clip(camera_name, label, now - self.pre_seconds, now + self.post_seconds)
+            for timestamp, jpeg in self.buffers.get(camera_name, ()):
+                if timestamp >= clip.start:
+                    clip.add(timestamp, jpeg)
+            self.clips[camera_name] = clip
+
+    def compress(self, frame):
+        if frame.shape[1] > self.max_width:
+            scale = self.max_width / frame.shape[1]
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return encoded.tobytes() if ok else None
+
+    def compress_loop(self):
+        while True:
+            try:
+                item = self.pending.get(timeout=0.5)
+            except queue.Empty:
+                self.finish_due()
+                continue
+            if item is None:
+                break
+
+            camera_name, timestamp, frame = item
+            jpeg = self.compress(frame)
+            if jpeg is None:
+                continue
+            with self.lock:
+                buffer = self.buffers.setdefault(camera_name, deque())
+                buffer.append((timestamp, jpeg))
+                self.buffer_bytes[camera_name] = self.buffer_bytes.get(camera_name, 0) + len(jpeg)
+
+                # Keep the pre-event window, within this camera's share of the memory budget
+                budget = self.max_buffer_bytes // len(self.buffers)
+                while buffer and (buffer[0][0] < timestamp - self.pre_seconds
+                                  or self.buffer_bytes[camera_name] > budget):
+                    self.buffer_bytes[camera_name] -= len(buffer.popleft()[1])
+
+                clip = self.clips.get(camera_name)
+                if clip is not None and clip.start <= timestamp <= clip.end:
+                    clip.add(timestamp, jpeg)
+                    if clip.bytes >= self.max_clip_bytes:
+                        # Split a very long event; the next part starts from this frame
+                        self.finished.put(self.clips.pop(camera_name))
+                        self.clips[camera_name] = next_clip = Clip(camera_name, clip.labels[0], timestamp, clip.end)
+                        next_clip.labels = list(clip.labels)
+            self.finish_due()
+
+    def finish_due(self, grace=1.0):
+        """Hand over clips whose post-event time has passed (plus a moment for queued frames)"""
+        now = time.monotonic()
+        with self.lock:
+            for camera_name in [name for name, clip in self.clips.items() if now > clip.end + grace]:
+                self.finished.put(self.clips.pop(camera_name))
+
+    def clip_path(self, clip):
+        prefix = f"{'-'.join(clip.labels)}_{clip.camera_name}"
+        return os.path.join(self.save_dir, timestamped_name(prefix, next(self.sequence), '.mp4', clip.created))
+
+    def write_loop(self):
+        while True:
+            clip = self.finished.get()
+            if clip is None:
+                break
+            if not clip.frames:
+                continue
+            path = self.clip_path(clip)
+            try:
+                duration = clip.frames[-1][0] - clip.frames[0][0]
+                fps = min(self.fps, max(1.0, (len(clip.frames) - 1) / duration)) if duration > 0 else self.fps
+                writer = None
+                for _, jpeg in clip.frames:
+                    frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if writer is None:
+                        height, width = frame.shape[:2]
+                        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+                    writer.write(frame)
+                writer.release()
+                self.written += 1
+                if self.on_written is not None:
+                    self.on_written(path)
+                print(f"Clip saved to {path} ({len(clip.frames)} frames, {duration:.1f}s)")
+            except Exception as e:
+                self.failed += 1
+                print(f"Error saving clip {path}: {e}")
+
+    def memory_bytes(self):
+        with self.lock:
+            return sum(self.buffer_bytes.values()) + sum(clip.bytes for clip in self.clips.values())
+
+    def close(self, timeout=10.0):
+        """Compress the queued frames, write every open clip, then stop the threads"""
+        self.pending.put(None)
+        self.threads[0].join(timeout)
+        with self.lock:
+            for camera_name in list(self.clips):
+                self.finished.put(self.clips.pop(camera_name))
+        self.finished.put(None)
+        self.threads[1].join(timeout)
+
+    def summary(self):
+        return (f"{self.memory_bytes() / (1 << 20):.1f} MB buffered, {len(self.clips)} recording, "
+                f"{self.written} written, {self.merged} events merged, {self.dropped} frames dropped")
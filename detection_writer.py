@@ -0,0 +1,104 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+
+def timestamped_name(prefix, sequence, extension='.jpg', now=None):
+    """Unique file name: millisecond timestamp plus a sequence number that only ever grows"""
+    if now is None:
+        now = datetime.now()
+    timestamp = now.strftime("%Y%m%d_%H%M%S") + f"_{now.microsecond // 1000:03d}"
+    return f"{prefix}_{timestamp}_{sequence:06d}{extension}"
+
+
+class DetectionWriter:
+    """Background JPEG writer so disk I/O never stalls the detection loop"""
+
+    def __init__(self, save_dir, jpeg_quality=90, max_pending=16, num_threads=1, latency=None):
+        self.save_dir = save_dir
+        self.latency = latency  # Optional LatencyRecorder for encode + write time
+        self.jpeg_quality = jpeg_quality
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.sequence = itertools.count(1)
+        self.sequence_lock = threading.Lock()
+
+        # Statistics
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.stats_lock = threading.Lock()
+
+        # cv2.imencode releases the GIL, so several threads can encode in parallel
+        self.threads = []
+        for index in range(num_threads):
+            thread = threading.Thread(target=self.worker, name=f'writer-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def make_filename(self, prefix):
+        """Unique name: millisecond timestamp plus a sequence number that only ever grows"""
+        now = datetime.now()
+        with self.sequence_lock:
+            sequence = next(self.sequence)
+        return timestamped_name(prefix, sequence, '.jpg', now)
+
+    def submit(self, frame, prefix):
+        """Queue a frame for writing and return its path, or None if it was dropped.
+
+        The frame is not copied, so the caller must not draw on it afterwards.
+        """
+        save_path = os.path.join(self.save_dir, self.make_filename(prefix))
+        try:
+            self.pending.put_nowait((frame, save_path))
+        except queue.Full:
+            # The disk can't keep up: drop this frame rather than block the caller
+            with self.stats_lock:
+                self.dropped += 1
+            return None
+        return save_path
+
+    def pending_count(self):
+        return self.pending.qsize()
+
+    def worker(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.pending.task_done()
+                break
+
+            frame, save_path = item
+            start = time.perf_counter()
+            try:
+                ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ok:
+                    raise ValueError("JPEG encoding failed")
+                with open(save_path, 'wb') as f:
+                    f.write(encoded.tobytes())
+                with self.stats_lock:
+                    self.written += 1
+                if self.latency is not None:
+                    self.latency.record('save_write', time.perf_counter() - start)
+                print(f"Detection saved to {save_path}")
+            except Exception as e:
+                with self.stats_lock:
+                    self.failed += 1
+                print(f"Error saving detection {save_path}: {e}")
+            finally:
+                self.pending.task_done()
+
+    def close(self, timeout=5.0):
+        """Finish writing queued frames, then stop the worker threads"""
+        for _ in self.threads:
+            self.pending.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def summary(self):
+        return (f"{self.written} written, {self.dropped} dropped, {self.failed} failed, "
+                f"{self.pending_count()} pending")
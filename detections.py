@@ -0,0 +1,77 @@
+import numpy as np
+
+# Compact record for one detection: class id, confidence, integer box corners,
+# whether face recognition matched the box to an authorized user, whether a face was
+# found in the box but matched no one, and the index of the camera zone it was found
+# in (-1 when the camera has no zones)
+DETECTION_DTYPE = np.dtype([
+    ('cls', np.int16),
+    ('conf', np.float32),
+    ('x1', np.int32),
+    ('y1', np.int32),
+    ('x2', np.int32),
+    ('y2', np.int32),
+    ('authorized', np.bool_),
+    ('rejected', np.bool_),
+    ('zone', np.int16),
+])
+
+
+def empty_detections():
+    return np.empty(0, dtype=DETECTION_DTYPE)
+
+
+def to_numpy(values):
+    """Convert a torch tensor (or anything array-like) to a numpy array"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu()
+    if hasattr(values, 'numpy'):
+        return values.numpy()
+    return np.asarray(values)
+
+
+def boxes_to_detections(boxes, class_ids, min_conf):
+    """Filter YOLO boxes with array masks and pack them into a structured array"""
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+
+    cls = to_numpy(boxes.cls).astype(np.int16, copy=False)
+    conf = to_numpy(boxes.conf).astype(np.float32, copy=False)
+    xyxy = to_numpy(boxes.xyxy).reshape(-1, 4)
+
+    # Keep target classes above the confidence threshold
+    mask = np.isin(cls, class_ids) & (conf > min_conf)
+
+    detections = np.empty(np.count_nonzero(mask), dtype=DETECTION_DTYPE)
+    detections['cls'] = cls[mask]
+    detections['conf'] = conf[mask]
+    kept = xyxy[mask].astype(np.int32)
+    detections['x1'] = kept[:, 0]
+    detections['y1'] = kept[:, 1]
+    detections['x2'] = kept[:, 2]
+    detections['y2'] = kept[:, 3]
+    detections['authorized'] = False
+    detections['rejected'] = False
+    detections['zone'] = -1
+    return detections
+
+
+def detection_boxes(detections):
+    """Return the boxes of a detection array as an (N, 4) float array"""
+    return np.stack([detections['x1'], detections['y1'], detections['x2'], detections['y2']],
+                    axis=1).astype(np.float32)
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) arrays of x1, y1, x2, y2 boxes"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    overlap = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).clip(0).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).clip(0).prod(axis=1)
+    union = area_a[:, None] + area_b[None, :] - overlap
+    return np.where(union > 0, overlap / np.maximum(union, 1e-6), 0.0)
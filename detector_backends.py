@@ -0,0 +1,165 @@
+import importlib
+import os
+import random
+import shutil
+
+import cv2
+import numpy as np
+
+from camera_sources import IMAGE_EXTENSIONS
+
+# Detector backends: the PyTorch eager path, or a model exported for a CPU runtime
+BACKENDS = ('torch', 'onnx', 'openvino')
+RUNTIMES = {'onnx': 'onnxruntime', 'openvino': 'openvino'}
+
+
+def runtime_available(backend):
+    module = RUNTIMES.get(backend)
+    if module is None:
+        return True
+    try:
+        importlib.import_module(module)
+        return True
+    except ImportError:
+        return False
+
+
+def is_stale(target, source):
+    """True if target is missing or older than the file it was made from"""
+    if not os.path.exists(target):
+        return True
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(target)
+
+
+def calibration_images(directory, count=200, seed=0):
+    """Pick up to `count` stored detection images, spread over the whole collection"""
+    if not directory or not os.path.isdir(directory):
+        return []
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    if len(paths) > count:
+        paths = sorted(random.Random(seed).sample(paths, count))
+    return paths
+
+
+def letterbox(image, size=640):
+    """Resize keeping the aspect ratio and pad to a square, the way ultralytics feeds the model"""
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    resized = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    padded = np.full((size, size, 3), 114, dtype=np.uint8)
+    top = (size - resized.shape[0]) // 2
+    left = (size - resized.shape[1]) // 2
+    padded[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return padded
+
+
+def calibration_batches(paths, imgsz=640):
+    """Yield model inputs (1, 3, imgsz, imgsz) float32 RGB in [0, 1] for each readable image"""
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        rgb = cv2.cvtColor(letterbox(image, imgsz), cv2.COLOR_BGR2RGB)
+        yield np.ascontiguousarray(rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def export_model(model_path, export_format, imgsz=640):
+    """Export the PyTorch weights with ultralytics; dynamic shapes keep batching and smaller input sizes working"""
+    from ultralytics import YOLO
+    print(f"Exporting {model_path} to {export_format}...")
+    return str(YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=True))
+
+
+def quantize_onnx(fp32_path, int8_path, paths, imgsz=640):
+    """Static int8 quantization with ONNX Runtime, calibrated on stored detection images"""
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = onnx.load(fp32_path, load_external_data=False).graph.input[0].name
+
+    class DetectionImages(CalibrationDataReader):
+        def __init__(self):
+            self.batches = calibration_batches(paths, imgsz)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {input_name: batch}
+
+    print(f"Calibrating int8 model on {len(paths)} stored detection images...")
+    quantize_static(fp32_path, int8_path, DetectionImages(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # ultralytics reads class names, stride and input size from the model metadata
+    source, quantized = onnx.load(fp32_path), onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, int8_path)
+
+
+def quantize_openvino(fp32_dir, int8_dir, paths, imgsz=640):
+    """Post-training int8 quantization with NNCF, calibrated on stored detection images"""
+    import nncf
+    import openvino as ov
+
+    xml_name = next(name for name in os.listdir(fp32_dir) if name.endswith('.xml'))
+    model = ov.Core().read_model(os.path.join(fp32_dir, xml_name))
+    print(f"Calibrating int8 model on {len(paths)} stored detection images...")
+    quantized = nncf.quantize(model, nncf.Dataset(list(calibration_batches(paths, imgsz))),
+                              subset_size=len(paths))
+
+    os.makedirs(int8_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(int8_dir, xml_name))
+    for name in os.listdir(fp32_dir):
+        if name.endswith('.yaml'):
+            shutil.copy(os.path.join(fp32_dir, name), int8_dir)
+
+
+def prepare_model(model_path, backend='torch', int8=False, calibration_dir=None, imgsz=640, recalibrate=False):
+    """Export (and optionally quantize) the model for a backend, reusing earlier exports.
+
+    Returns (path to load, backend actually used). A missing runtime or a failed export
+    falls back to the PyTorch weights so the system still starts.
+    """
+    if backend == 'torch':
+        return model_path, 'torch'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend {backend}, expected one of {', '.join(BACKENDS)}")
+    if not runtime_available(backend):
+        print(f"{RUNTIMES[backend]} is not installed, falling back to PyTorch")
+        return model_path, 'torch'
+
+    stem = os.path.splitext(model_path)[0]
+    try:
+        if backend == 'onnx':
+            path = stem + '.onnx'
+            if is_stale(path, model_path):
+                path = export_model(model_path, 'onnx', imgsz)
+            int8_path = stem + '_int8.onnx'
+            quantize = quantize_onnx
+        else:
+            path = stem + '_openvino_model'
+            if is_stale(path, model_path):
+                path = export_model(model_path, 'openvino', imgsz)
+            int8_path = stem + '_int8_openvino_model'
+            quantize = quantize_openvino
+
+        if int8:
+            if recalibrate or is_stale(int8_path, path):
+                paths = calibration_images(calibration_dir)
+                if not paths:
+                    print(f"No stored detection images in {calibration_dir} to calibrate on, "
+                          f"using the float {backend} model")
+                    return path, backend
+                quantize(path, int8_path, paths, imgsz)
+            path = int8_path
+    except Exception as e:
+        print(f"Could not prepare the {backend} model ({e}), falling back to PyTorch")
+        return model_path, 'torch'
+    return path, backend
+
+
+def load_detector(path):
+    """Load weights or an exported model; ultralytics picks the matching runtime from the path"""
+    from ultralytics import YOLO
+    return YOLO(path, task='detect')
@@ -1,343 +1,1093 @@
-import cv2
-import numpy as np
-import time
-from ultralytics import YOLO
-import pygame
-import os
-from datetime import datetime
-import face_recognition
-import pickle
-
-class EnhancedFarmSecuritySystem:
-    def __init__(self):
-        # Initialize pygame for sound
-        pygame.mixer.init()
-        
-        # Load alert sounds
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        self.human_alert = pygame.mixer.Sound(os.path.join(current_dir, 'human_alert.wav'))
-        self.animal_alert = pygame.mixer.Sound(os.path.join(current_dir, 'animal_alert.wav'))
-        self.bird_alert = pygame.mixer.Sound(os.path.join(current_dir, 'bird_alert.wav'))
-        
-        # Initialize the webcam (0 is usually the default camera)
-        self.cap = cv2.VideoCapture(0)
-        
-        # Check if camera opened successfully
-        if not self.cap.isOpened():
-            print("Error: Could not open camera.")
-            exit()
-            
-        # Set the resolution
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        # Load YOLOv8 model
-        self.model = YOLO('yolov8n.pt')  # Using the nano model for faster inference
-        
-        # Define classes of interest (based on COCO dataset used by YOLOv8)
-        self.target_classes = {
-            0: {'name': 'person', 'type': 'human'},  # Humans
-            14: {'name': 'bird', 'type': 'bird'},   # Birds
-            15: {'name': 'cat', 'type': 'animal'},    # Cats
-            16: {'name': 'dog', 'type': 'animal'},    # Dogs
-            17: {'name': 'horse', 'type': 'animal'},  # Horse 
-            18: {'name': 'sheep', 'type': 'animal'},  # Sheep
-            19: {'name': 'cow', 'type': 'animal'},    # Cow
-            20: {'name': 'elephant', 'type': 'animal'}, # Elephant
-            21: {'name': 'bear', 'type': 'animal'},   # Bear
-            22: {'name': 'zebra', 'type': 'animal'},  # Zebra
-            23: {'name': 'giraffe', 'type': 'animal'} # Giraffe
-        }
-        
-        # Cooldown time between alerts (in seconds)
-        self.cooldown = 5
-        self.last_alert_time = time.time() - self.cooldown
-        
-        # Create directories
-        self.save_dir = os.path.join(current_dir, 'detected_images')
-        self.authorized_dir = os.path.join(current_dir, 'authorized_users')
-        os.makedirs(self.save_dir, exist_ok=True)
-        os.makedirs(self.authorized_dir, exist_ok=True)
-        
-        # Load authorized users
-        self.known_face_encodings = []
-        self.known_face_names = []
-        self.load_authorized_users()
-        
-        # Face recognition parameters
-        self.face_recognition_enabled = True
-        self.face_recognition_cooldown = 1.0  # Check faces every second to save CPU
-        self.last_face_check_time = 0
-        
-    def load_authorized_users(self):
-        """Load authorized users' face encodings from files"""
-        encodings_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'authorized_users.pkl')
-        
-        if os.path.exists(encodings_file):
-            try:
-                with open(encodings_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.known_face_encodings = data['encodings']
-                    self.known_face_names = data['names']
-                print(f"Loaded {len(self.known_face_encodings)} authorized users")
-            except Exception as e:
-                print(f"Error loading authorized users: {e}")
-                # Initialize empty if there's an error
-                self.known_face_encodings = []
-                self.known_face_names = []
-        else:
-            print("No authorized users file found. Starting with empty authorized list.")
-    
-    def save_authorized_users(self):
-        """Save authorized users' face encodings to file"""
-        data = {
-            'encodings': self.known_face_encodings,
-            'names': self.known_face_names
-        }
-        encodings_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'authorized_users.pkl')
-        
-        with open(encodings_file, 'wb') as f:
-            pickle.dump(data, f)
-        print(f"Saved {len(self.known_face_encodings)} authorized users")
-    
-    def add_authorized_user(self, name, face_encoding):
-        """Add a new authorized user"""
-        self.known_face_encodings.append(face_encoding)
-        self.known_face_names.append(name)
-        self.save_authorized_users()
-        print(f"Added authorized user: {name}")
-        
-    def play_alert(self, detected_type, detected_class):
-        """Play appropriate alert sound based on the type of detection"""
-        current_time = time.time()
-        if current_time - self.last_alert_time > self.cooldown:
-            print(f"⚠️ ALERT! Detected: {detected_class}")
-            
-            if detected_type == 'human':
-                self.human_alert.play()
-            elif detected_type == 'animal':
-                self.animal_alert.play()
-            elif detected_type == 'bird':
-                self.bird_alert.play()
-                
-            self.last_alert_time = current_time
-    
-    def save_detection(self, frame, detected_class):
-        """Save the frame with detection for record keeping"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{detected_class}_{timestamp}.jpg"
-        save_path = os.path.join(self.save_dir, filename)
-        cv2.imwrite(save_path, frame)
-        print(f"Detection saved to {save_path}")
-    
-    def add_new_user_mode(self):
-        """Enter interactive mode to add a new authorized user"""
-        print("\nEntering New User Registration Mode")
-        print("Please position your face in the camera")
-        print("Press 'c' to capture, 'q' to cancel")
-        
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Failed to grab frame")
-                break
-                
-            # Mirror the frame (flip horizontally for more natural view)
-            frame = cv2.flip(frame, 1)
-            
-            # Draw a face positioning guide
-            height, width = frame.shape[:2]
-            center_x, center_y = width // 2, height // 2
-            cv2.rectangle(frame, (center_x - 100, center_y - 125), 
-                          (center_x + 100, center_y + 125), (0, 255, 0), 2)
-            
-            # Add instructions to the frame
-            cv2.putText(frame, "Position face in the green box", 
-                      (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(frame, "Press 'c' to capture, 'q' to cancel", 
-                      (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            # Display the frame
-            cv2.imshow('New User Registration', frame)
-            
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                print("User registration cancelled")
-                cv2.destroyWindow('New User Registration')
-                return False
-                
-            elif key == ord('c'):
-                # Try to find a face in the current frame
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                face_locations = face_recognition.face_locations(rgb_frame)
-                
-                if not face_locations:
-                    print("No face detected. Please position your face clearly in the green box.")
-                    continue
-                    
-                # Take one face encoding (the first one found)
-                face_encoding = face_recognition.face_encodings(rgb_frame, face_locations)[0]
-                
-                # Ask for a name for this user
-                cv2.destroyWindow('New User Registration')
-                name = input("Enter name for this authorized user: ")
-                
-                # Save user image
-                user_image_path = os.path.join(self.authorized_dir, f"{name}.jpg")
-                top, right, bottom, left = face_locations[0]
-                # Expand the face region slightly
-                padding = 30
-                top = max(0, top - padding)
-                left = max(0, left - padding)
-                bottom = min(frame.shape[0], bottom + padding)
-                right = min(frame.shape[1], right + padding)
-                face_image = frame[top:bottom, left:right]
-                cv2.imwrite(user_image_path, face_image)
-                
-                # Add the user to authorized list
-                self.add_authorized_user(name, face_encoding)
-                print(f"User {name} added successfully!")
-                return True
-    
-    def is_authorized(self, frame):
-        """Check if there are any authorized users in the frame"""
-        current_time = time.time()
-        
-        # Only process face recognition periodically to save CPU
-        if current_time - self.last_face_check_time < self.face_recognition_cooldown:
-            return False
-            
-        self.last_face_check_time = current_time
-        
-        # If no authorized users are registered yet, no one can be authorized
-        if len(self.known_face_encodings) == 0:
-            return False
-            
-        # Convert the image from BGR to RGB (face_recognition uses RGB)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Find all faces in the current frame
-        face_locations = face_recognition.face_locations(rgb_frame)
-        
-        if not face_locations:
-            return False
-            
-        # Get face encodings for all faces in the frame
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-        
-        for face_encoding in face_encodings:
-            # Compare with known faces
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.6)
-            
-            # If any match is found, the person is authorized
-            if True in matches:
-                name_index = matches.index(True)
-                name = self.known_face_names[name_index]
-                
-                # Draw a green box around authorized face
-                top, right, bottom, left = face_locations[face_encodings.index(face_encoding)]
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.putText(frame, f"Authorized: {name}", (left, top - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                
-                return True
-        
-        return False
-    
-    def run(self):
-        """Main function to run the detection system"""
-        print("Starting Enhanced Farm Security System...")
-        print("Press 'a' to add authorized user")
-        print("Press 'q' to quit")
-        
-        try:
-            while True:
-                # Capture frame-by-frame
-                ret, frame = self.cap.read()
-                
-                if not ret:
-                    print("Failed to grab frame")
-                    break
-                
-                # Mirror the frame (flip horizontally for more natural view)
-                frame = cv2.flip(frame, 1)
-                
-                # Check for authorized users
-                authorized_person_present = False
-                if self.face_recognition_enabled:
-                    authorized_person_present = self.is_authorized(frame)
-                
-                # Run YOLOv8 inference on the frame
-                results = self.model(frame)
-                
-                # Process detections
-                for result in results:
-                    boxes = result.boxes
-                    for box in boxes:
-                        # Get class and confidence
-                        cls_id = int(box.cls[0].item())
-                        conf = box.conf[0].item()
-                        
-                        # Check if detected class is in our target list and confidence is high enough
-                        if cls_id in self.target_classes and conf > 0.5:
-                            # Get coordinates and draw bounding box
-                            x1, y1, x2, y2 = box.xyxy[0].tolist()
-                            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                            
-                            detected_info = self.target_classes[cls_id]
-                            detected_class = detected_info['name']
-                            detected_type = detected_info['type']
-                            
-                            # Draw bounding box with class name
-                            color = (0, 255, 0) if (detected_type == 'human' and authorized_person_present) else (0, 0, 255)
-                            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                            cv2.putText(frame, f"{detected_class} {conf:.2f}", 
-                                      (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                            
-                            # Only trigger alert if it's not an authorized person
-                            # For humans, check authorization
-                            # For animals and birds, always alert
-                            if not (detected_type == 'human' and authorized_person_present):
-                                self.play_alert(detected_type, detected_class)
-                                self.save_detection(frame, detected_class)
-                
-                # Add title and instructions to the frame
-                cv2.putText(frame, "Enhanced Farm Security System", 
-                          (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
-                
-                auth_status = "Authorized User: YES" if authorized_person_present else "Authorized User: NO"
-                cv2.putText(frame, auth_status, 
-                          (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-                          
-                cv2.putText(frame, "Press 'a' to add authorized user, 'q' to quit", 
-                          (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-                
-                # Display the resulting frame
-                cv2.imshow('Farm Security System', frame)
-                
-                # Check for key press
-                key = cv2.waitKey(1) & 0xFF
-                
-                # Add authorized user
-                if key == ord('a'):
-                    self.add_new_user_mode()
-                
-                # Exit on 'q' press
-                elif key == ord('q'):
-                    break
-                    
-        finally:
-            # Release the camera and close windows
-            self.cap.release()
-            cv2.destroyAllWindows()
-            print("Farm Security System stopped")
-    
-    def __del__(self):
-        # Ensure resources are released
-        if hasattr(self, 'cap'):
-            self.cap.release()
-
-
-if __name__ == "__main__":
-    security_system = EnhancedFarmSecuritySystem()
+import cv2
+import numpy as np
+import time
+import os
+import threading
+import argparse
+import signal
+from frame_pipeline import DropOldestQueue, StageStats, PipelineReporter, LatencyRecorder
+from camera_sources import CameraSource
+from motion_gate import MotionGate
+from detections import boxes_to_detections
+from tracker import IoUTracker
+from detection_writer import DetectionWriter
+from clip_recorder import ClipRecorder
+from event_store import EventStore
+from image_retention import ImageRetention
+from alert_dispatcher import Alert, AlertDispatcher, LogSink, SoundSink, WebhookSink
+from face_index import FaceIndex
+from authorized_user_store import AuthorizedUserStore
+from identity_cache import IdentityCache
+from metrics import MetricsRegistry, MetricsServer
+from frame_scheduler import AdaptiveScheduler
+from tiled_inference import FULL_RESOLUTION, TiledDetector, merge_crops
+from roi_zones import CameraZones, load_zones
+from face_encoding import encode_faces
+from process_pipeline import ProcessPipeline
+from detector_backends import BACKENDS, load_detector, prepare_model
+
+# Heavy modules are imported on first use so the unit starts detecting quickly:
+# face_recognition (dlib) only once an authorized user exists, ultralytics on the
+# model loading thread and pygame when the alert sounds are loaded
+face_recognition = None
+
+
+def load_face_recognition():
+    """Import face_recognition the first time it is needed"""
+    global face_recognition
+    if face_recognition is None:
+        import face_recognition as module
+        face_recognition = module
+    return face_recognition
+
+
+# Classes of interest (based on COCO dataset used by YOLOv8) and the minimum confidence,
+# shared with the offline batch scan
+TARGET_CLASSES = {
+    0: {'name': 'person', 'type': 'human'},  # Humans
+    14: {'name': 'bird', 'type': 'bird'},   # Birds
+    15: {'name': 'cat', 'type': 'animal'},    # Cats
+    16: {'name': 'dog', 'type': 'animal'},    # Dogs
+    17: {'name': 'horse', 'type': 'animal'},  # Horse 
+    18: {'name': 'sheep', 'type': 'animal'},  # Sheep
+    19: {'name': 'cow', 'type': 'animal'},    # Cow
+    20: {'name': 'elephant', 'type': 'animal'}, # Elephant
+    21: {'name': 'bear', 'type': 'animal'},   # Bear
+    22: {'name': 'zebra', 'type': 'animal'},  # Zebra
+    23: {'name': 'giraffe', 'type': 'animal'} # Giraffe
+}
+CONFIDENCE_THRESHOLD = 0.5
+
+
+class EnhancedFarmSecuritySystem:
+    def __init__(self, sources=None, display=True, save_dir=None, lossless=False, metrics_port=None,
+                 headless=False, model_path='yolov8n.pt', target_fps=None, tiled=False,
+                 zones_path=None, processes=0, backend='torch', int8=False, clip_seconds=(5.0, 10.0),
+                 clip_buffer_mb=32, storage_gb=2.0, webhook_url=None):
+        startup_time = time.monotonic()
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        
+        # Define classes of interest (based on COCO dataset used by YOLOv8)
+        self.target_classes = dict(TARGET_CLASSES)
+        
+        # Class ids are handed to the model so other classes are dropped during NMS
+        self.target_class_ids = sorted(self.target_classes)
+        self.human_class_ids = [cls_id for cls_id, info in self.target_classes.items()
+                                if info['type'] == 'human']
+        self.confidence_threshold = CONFIDENCE_THRESHOLD
+        
+        # Load and warm up YOLOv8 on its own thread while the cameras open. In multi-process
+        # mode (processes > 0) the detection worker processes load their own copies instead
+        self.model_path = model_path  # The nano model is used for faster inference
+        self.model = None
+        self.model_error = None
+        
+        # Detector backend: 'torch' (PyTorch eager), or 'onnx' / 'openvino' with an exported model,
+        # optionally int8-quantized with calibration on the stored detection images
+        self.backend = backend
+        self.int8 = int8
+        self.calibration_dir = save_dir or os.path.join(current_dir, 'detected_images')
+        self.detector_path = model_path
+        
+        self.processes = processes
+        model_thread = None
+        if not processes:
+            model_thread = threading.Thread(target=self.load_model, name='model-loader', daemon=True)
+            model_thread.start()
+        
+        # Headless service mode: no window, no overlay drawing (boxes are only drawn on
+        # frames that get saved), lost live cameras are reopened and SIGTERM stops cleanly
+        self.headless = headless
+        
+        # Prepare the alert sounds in memory (units without an audio device keep running silently)
+        self.sound_sink = self.load_sounds(current_dir)
+        
+        # Pipeline parameters
+        self.display = display and not headless  # Show the OpenCV window (off for replays and benchmarks)
+        self.lossless = lossless  # Process every frame instead of dropping the oldest (replays)
+        self.queue_size = 2  # Frames waiting between stages before the oldest is dropped
+        self.stats_interval = 10.0  # Seconds between stage throughput reports
+        
+        # Metrics, served in the Prometheus text format on a local port (None = no endpoint)
+        self.metrics_port = metrics_port
+        self.metrics = MetricsRegistry()
+        self.latency = LatencyRecorder(histogram=self.metrics.histogram(
+            'farm_stage_latency_seconds', 'Time spent in each pipeline stage'))
+        self.frames_counter = self.metrics.counter(
+            'farm_frames_total', 'Frames that went through the render/alert stage')
+        self.detections_counter = self.metrics.counter(
+            'farm_detections_total', 'Target detections by class and type')
+        self.alerts_counter = self.metrics.counter(
+            'farm_alerts_total', 'Alerts raised by type')
+        
+        # Adaptive scheduling: with a target FPS the frame stride, YOLO input size and
+        # face check rate are adjusted to the measured detection cost
+        self.frame_stride = 1  # Run detection on every N-th frame of each camera
+        self.model_imgsz = 640  # YOLO input size
+        self.scheduler = None
+        if target_fps:
+            self.scheduler = AdaptiveScheduler(target_fps, on_change=self.apply_schedule)
+        
+        # Motion gate parameters: YOLO only runs when enough of the frame changed
+        self.motion_gate_enabled = True
+        self.motion_threshold = 0.005  # Fraction of the downscaled frame that must change
+        self.motion_force_interval = 5.0  # Run a full detection at least this often (seconds)
+        
+        # Tiled inference for small, distant birds: capture at full sensor resolution and run
+        # YOLO on overlapping tiles (only the ones that moved), merged with cross-tile NMS
+        self.tile_size = 640
+        self.tile_overlap = 0.2  # Share of a tile repeated in its neighbour
+        self.tile_merge_threshold = 0.6  # Cross-crop NMS: covered share of the smaller box
+        self.tiler = None
+        if tiled:
+            self.tiler = TiledDetector(self.tile_size, self.tile_overlap,
+                                       motion_threshold=self.motion_threshold,
+                                       force_interval=self.motion_force_interval)
+        capture_width, capture_height = FULL_RESOLUTION if tiled else (640, 480)
+        
+        # Region-of-interest zones: polygons per camera, each alerting on its own classes.
+        # Cameras with zones only run YOLO on the zone crops and drop anything outside them
+        self.zones = load_zones(zones_path, self.target_classes) if zones_path else {}
+        
+        # Tracking parameters: alerts and saves happen once per tracked object
+        self.tracker_iou_threshold = 0.3  # Minimum box overlap to continue a track
+        self.tracker_max_missed = 5  # Detection runs an object may go unseen before it leaves
+        self.snapshot_interval = 60.0  # Extra snapshot of a tracked object every N seconds (0 = off)
+        
+        # Initialize the cameras (0 is usually the default webcam). Each source can be
+        # a device index, a video file, an RTSP/HTTP stream URL, a folder of images or
+        # a synthetic generator ("synthetic:frames=300")
+        if sources is None:
+            sources = [0]
+        self.frame_condition = threading.Condition()
+        self.cameras = []
+        for index, source in enumerate(sources):
+            camera = CameraSource(f"cam{index}", source, capture_width, capture_height,
+                                  queue_size=self.queue_size,
+                                  condition=self.frame_condition, lossless=self.lossless,
+                                  latency=self.latency, reconnect=self.headless)
+            
+            # Check if camera opened successfully. An unattended unit may boot before its
+            # cameras do, so headless mode keeps live sources and its capture thread keeps
+            # reconnecting with the usual backoff
+            if not camera.is_opened():
+                if not (camera.reconnect and camera.is_live()):
+                    print(f"Error: Could not open camera source {source}.")
+                    continue
+                print(f"[{camera.name}] Camera source {source} is not available yet, will keep retrying")
+            camera.motion_gate = MotionGate(self.motion_threshold, self.motion_force_interval)
+            camera.tracker = IoUTracker(self.tracker_iou_threshold, self.tracker_max_missed)
+            camera.frame_index = 0
+            camera.zones = CameraZones(self.zones[camera.name]) if camera.name in self.zones else None
+            self.cameras.append(camera)
+        
+        if not self.cameras:
+            print("Error: Could not open camera.")
+            exit()
+        
+        # The first camera is used for registering new users
+        self.cap = self.cameras[0].cap
+        
+        # Cooldown between alerts (in seconds), kept separately per type and per camera zone
+        self.alert_cooldowns = {'human': 5, 'animal': 5, 'bird': 5}
+        self.webhook_url = webhook_url  # Optional HTTP endpoint that gets every alert as JSON
+        
+        # Create directories
+        self.save_dir = save_dir or os.path.join(current_dir, 'detected_images')
+        self.authorized_dir = os.path.join(current_dir, 'authorized_users')
+        os.makedirs(self.save_dir, exist_ok=True)
+        os.makedirs(self.authorized_dir, exist_ok=True)
+        
+        # Detections are JPEG-encoded and written on a background thread
+        self.jpeg_quality = 90
+        self.max_pending_writes = 16  # Frames waiting for the disk before new ones are dropped
+        self.writer = None
+        if not processes:
+            self.writer = DetectionWriter(self.save_dir, self.jpeg_quality, self.max_pending_writes,
+                                          latency=self.latency)
+        
+        # Detection images and event clips stay within a disk budget: full frames for a week,
+        # thumbnails after that, nothing older than 90 days, and the oldest go first when space runs short
+        self.storage_max_bytes = int(storage_gb * (1 << 30))
+        self.full_resolution_days = 7
+        self.image_max_age_days = 90
+        self.clip_dir = os.path.join(self.save_dir, 'clips')
+        self.retention = ImageRetention(self.save_dir, self.storage_max_bytes,
+                                        self.full_resolution_days * 86400, self.image_max_age_days * 86400,
+                                        clips_dir=self.clip_dir)
+        
+        # Alerts are delivered by worker threads, most urgent type first: sound, a local
+        # log and the webhook each have their own, so none of them can stall detection
+        sinks = [LogSink(os.path.join(self.save_dir, 'alerts.log'))]
+        if self.sound_sink is not None:
+            sinks.insert(0, self.sound_sink)
+        if self.webhook_url:
+            sinks.append(WebhookSink(self.webhook_url))
+        self.alerts = AlertDispatcher(sinks, self.alert_cooldowns, latency=self.latency)
+        
+        # Every alert and snapshot goes to an indexed SQLite store (query with event_store.py)
+        self.events = EventStore(os.path.join(self.save_dir, 'events.db'))
+        
+        # Event clips: recent frames stay JPEG-compressed in memory so each alert can be saved
+        # as a clip from a few seconds before to a few seconds after it (0 MB = off)
+        self.clip_pre_seconds, self.clip_post_seconds = clip_seconds
+        self.clip_buffer_bytes = int(clip_buffer_mb * (1 << 20))  # Pre-event frames of all cameras
+        self.clip_max_bytes = self.clip_buffer_bytes  # Per clip being recorded; longer events are split
+        self.clip_fps = 10  # Frames per second kept for clips
+        self.clips = None
+        if self.clip_buffer_bytes:
+            self.clips = ClipRecorder(self.clip_dir, self.clip_pre_seconds,
+                                      self.clip_post_seconds, self.clip_buffer_bytes, self.clip_max_bytes,
+                                      self.clip_fps, on_written=self.retention.add)
+        
+        # Face recognition parameters (faces are only searched inside person boxes)
+        self.face_recognition_enabled = True
+        self.face_recognition_cooldown = 1.0  # Check faces every second to save CPU
+        self.face_grace_checks = 2  # Face check intervals a new person gets before the human alert
+        self.face_tolerance = 0.6  # Maximum encoding distance that counts as a match
+        self.face_ann_threshold = 1000  # Use an approximate index above this many users
+        self.person_crop_padding = 0.1  # Extra margin around person boxes, as a fraction of their size
+        self.person_crop_min_height = 240  # Smaller person crops are upscaled to this height
+        self.person_crop_max_upscale = 3.0
+        
+        # Identity cache: an authorized person stays authorized until they leave or the TTL runs out
+        self.identity_ttl = 30.0  # Re-verify a cached face after this many seconds
+        self.identity_leave_after = 10.0  # Forget a person not seen for this many seconds
+        self.identity_caches = {}  # One cache per camera
+        
+        # Load authorized users into one contiguous encoding matrix
+        self.face_index = FaceIndex(self.face_ann_threshold)
+        self.load_authorized_users()
+        
+        self.last_face_check_time = {}  # Per camera, so every camera gets checked
+        
+        self.register_metric_callbacks()
+        
+        # Multi-process mode: frames go through shared memory to detection, face and writer processes
+        self.pipeline = None
+        if processes:
+            self.prepare_detector()
+            self.pipeline = ProcessPipeline(self, processes)
+            self.writer = self.pipeline.writer
+            if not self.pipeline.wait_ready():
+                print(f"Error: Detection workers could not load model {self.model_path}")
+                self.pipeline.stop()
+                exit()
+        
+        # Wait for the model thread, the cameras and users were loaded meanwhile
+        if model_thread is not None:
+            model_thread.join()
+            if self.model is None:
+                print(f"Error: Could not load model {self.model_path}: {self.model_error}")
+                exit()
+        print(f"Ready after {time.monotonic() - startup_time:.1f}s")
+        
+    def prepare_detector(self):
+        """Export the model for the chosen backend if needed (falls back to PyTorch if it can't)"""
+        self.detector_path, self.backend = prepare_model(self.model_path, self.backend, self.int8,
+                                                         self.calibration_dir)
+    
+    def load_model(self):
+        """Prepare the detector backend, load YOLOv8 and run one warm-up inference"""
+        try:
+            start = time.monotonic()
+            self.prepare_detector()
+            model = load_detector(self.detector_path)
+            
+            # The first call sets up the network, do it before real frames arrive
+            model(np.zeros((480, 640, 3), dtype=np.uint8), classes=self.target_class_ids, verbose=False)
+            self.model = model
+            print(f"Model {self.detector_path} ({self.backend}) loaded and warmed up in "
+                  f"{time.monotonic() - start:.1f}s")
+        except Exception as e:
+            self.model_error = e
+    
+    def apply_schedule(self, settings):
+        """Apply the scheduler's current effort level"""
+        self.frame_stride = settings['stride']
+        self.model_imgsz = settings['imgsz']
+        self.face_recognition_cooldown = settings['face_interval']
+    
+    def load_sounds(self, current_dir):
+        """Initialize pygame and decode (or synthesize) the alert sounds, None without audio"""
+        try:
+            return SoundSink(current_dir)
+        except Exception as e:
+            print(f"Sound disabled: {e}")
+            return None
+        
+    def register_metric_callbacks(self):
+        """Expose counters the components already keep; they are only read when scraped"""
+        self.metrics.callback('farm_frames_captured_total', 'Frames read from each camera', 'counter',
+                              lambda: [({'camera': c.name}, c.stats.count) for c in self.cameras])
+        self.metrics.callback('farm_frames_skipped_total', 'Frames the motion gate kept away from YOLO',
+                              'counter', lambda: [({'camera': c.name}, c.motion_gate.frames_skipped)
+                                                  for c in self.cameras])
+        
+        def queues():
+            named = [(c.name, c.queue) for c in self.cameras]
+            if hasattr(self, 'result_queue'):
+                named.append(('result', self.result_queue))
+            return named
+        
+        self.metrics.callback('farm_frames_dropped_total', 'Frames dropped by a full pipeline queue',
+                              'counter', lambda: [({'queue': name}, q.dropped) for name, q in queues()])
+        self.metrics.callback('farm_queue_depth', 'Items waiting in each pipeline queue', 'gauge',
+                              lambda: [({'queue': name}, q.qsize()) for name, q in queues()])
+        self.metrics.callback('farm_detection_writes_total', 'Detection images by outcome', 'counter',
+                              lambda: [({'result': 'written'}, self.writer.written),
+                                       ({'result': 'dropped'}, self.writer.dropped),
+                                       ({'result': 'failed'}, self.writer.failed)])
+        self.metrics.callback('farm_detection_write_queue_depth', 'Detection images waiting for the disk',
+                              'gauge', lambda: [({}, self.writer.pending_count())])
+        self.metrics.callback('farm_storage_bytes', 'Detection images and clips on disk by tier', 'gauge',
+                              lambda: [({'tier': 'full'}, self.retention.full_bytes),
+                                       ({'tier': 'thumbnail'}, self.retention.thumbnail_bytes),
+                                       ({'tier': 'clip'}, self.retention.clip_bytes)])
+        self.metrics.callback('farm_storage_files', 'Detection image and clip files on disk by tier', 'gauge',
+                              lambda: [({'tier': 'full'}, len(self.retention.full)),
+                                       ({'tier': 'thumbnail'}, len(self.retention.thumbnails)),
+                                       ({'tier': 'clip'}, len(self.retention.clips))])
+        self.metrics.callback('farm_storage_removals_total', 'Detection files shrunk or deleted by retention',
+                              'counter', lambda: [({'reason': 'thumbnailed'}, self.retention.thumbnailed),
+                                                  ({'reason': 'evicted'}, self.retention.evicted),
+                                                  ({'reason': 'expired'}, self.retention.expired)])
+        self.metrics.callback('farm_alert_deliveries_total', 'Alerts handed to each sink by outcome', 'counter',
+                              lambda: [sample for worker in self.alerts.workers
+                                       for sample in (({'sink': worker.name, 'result': 'delivered'}, worker.delivered),
+                                                      ({'sink': worker.name, 'result': 'failed'}, worker.failed),
+                                                      ({'sink': worker.name, 'result': 'dropped'}, worker.dropped))])
+        self.metrics.callback('farm_alerts_suppressed_total', 'Alerts held back by their type and zone cooldown',
+                              'counter', lambda: [({}, self.alerts.suppressed)])
+        self.metrics.callback('farm_events_total', 'Detection events by store outcome', 'counter',
+                              lambda: [({'result': 'written'}, self.events.written),
+                                       ({'result': 'dropped'}, self.events.dropped),
+                                       ({'result': 'failed'}, self.events.failed)])
+        if self.clips is not None:
+            self.metrics.callback('farm_clip_buffer_bytes', 'Compressed frames held in memory for event clips',
+                                  'gauge', lambda: [({}, self.clips.memory_bytes())])
+            self.metrics.callback('farm_clips_total', 'Event clips by outcome', 'counter',
+                                  lambda: [({'result': 'written'}, self.clips.written),
+                                           ({'result': 'failed'}, self.clips.failed),
+                                           ({'result': 'merged'}, self.clips.merged)])
+        
+        def identity_lookups():
+            samples = []
+            for name, cache in list(self.identity_caches.items()):
+                samples.append(({'camera': name, 'result': 'hit'}, cache.hits))
+                samples.append(({'camera': name, 'result': 'miss'}, cache.misses))
+            return samples
+        
+        self.metrics.callback('farm_identity_cache_lookups_total', 'Identity cache lookups by result',
+                              'counter', identity_lookups)
+        if self.scheduler is not None:
+            self.metrics.callback('farm_scheduler_level', 'Current adaptive scheduler effort level (0 = full)',
+                                  'gauge', lambda: [({}, self.scheduler.active_level())])
+            self.metrics.callback('farm_scheduler_adjustments_total', 'Adaptive scheduler level changes',
+                                  'counter', lambda: [({}, self.scheduler.adjustments)])
+        if self.tiler is not None:
+            self.metrics.callback('farm_tiles_total', 'Inference tiles by outcome', 'counter',
+                                  lambda: [({'result': 'run'}, self.tiler.tiles_run),
+                                           ({'result': 'skipped'}, self.tiler.tiles_seen - self.tiler.tiles_outside
+                                            - self.tiler.tiles_run),
+                                           ({'result': 'outside_zones'}, self.tiler.tiles_outside)])
+        if self.zones:
+            self.metrics.callback('farm_zone_detections_total', 'Detections inside and outside the camera zones',
+                                  'counter', lambda: [
+                                      sample for camera in self.cameras if camera.zones is not None
+                                      for sample in (({'camera': camera.name, 'result': 'inside'}, camera.zones.inside),
+                                                     ({'camera': camera.name, 'result': 'outside'}, camera.zones.outside))])
+        if self.processes:
+            self.metrics.callback('farm_worker_restarts_total', 'Worker processes restarted after a crash',
+                                  'counter', lambda: [({'worker': worker.name}, worker.restarts)
+                                                      for worker in self.pipeline.workers])
+            self.metrics.callback('farm_ring_slots_in_use', 'Shared memory frame slots in use',
+                                  'gauge', lambda: [({}, self.pipeline.ring.in_use())])
+        self.metrics.callback('farm_authorized_users', 'Face encodings in the authorized user index',
+                              'gauge', lambda: [({}, len(self.face_index))])
+        
+    def load_authorized_users(self):
+        """Load authorized users' face encodings from the memory-mapped store"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        
+        try:
+            self.user_store = AuthorizedUserStore(os.path.join(current_dir, 'authorized_store'))
+            
+            # Older installs kept everything in one pickle; import it the first time
+            self.user_store.migrate_pickle(os.path.join(current_dir, 'authorized_users.pkl'))
+            
+            self.face_index.set(self.user_store.encodings(), self.user_store.names())
+            if len(self.face_index):
+                print(f"Loaded {len(self.face_index)} authorized users")
+            else:
+                print("No authorized users found. Starting with empty authorized list.")
+        except Exception as e:
+            print(f"Error loading authorized users: {e}")
+            # Initialize empty if there's an error
+            self.face_index.clear()
+    
+    def add_authorized_user(self, name, face_encoding, **metadata):
+        """Add a new authorized user"""
+        self.user_store.add(name, face_encoding, **metadata)
+        self.face_index.add(name, face_encoding)
+        print(f"Added authorized user: {name}")
+    
+    def remove_authorized_user(self, name):
+        """Remove an authorized user"""
+        removed = self.user_store.delete(name)
+        if removed:
+            self.face_index.set(self.user_store.encodings(), self.user_store.names())
+            print(f"Removed authorized user: {name}")
+        return removed
+        
+    def raise_alert(self, alert):
+        """Hand an alert to the sinks unless its type is cooling down in that zone"""
+        if self.alerts.submit(alert):
+            print(f"⚠️ ALERT! Detected: {alert.detected_class}")
+            self.alerts_counter.inc(type=alert.detected_type)
+    
+    def save_detection(self, frame, detected_class, camera_name=None):
+        """Queue the frame with detection to be saved for record keeping.
+
+        The frame is handed over without a copy, so it must not be drawn on afterwards.
+        """
+        prefix = f"{detected_class}_{camera_name}" if camera_name else detected_class
+        save_path = self.writer.submit(frame, prefix)
+        self.retention.add(save_path)
+        return save_path
+    
+    def add_new_user_mode(self):
+        """Enter interactive mode to add a new authorized user"""
+        print("\nEntering New User Registration Mode")
+        print("Please position your face in the camera")
+        print("Press 'c' to capture, 'q' to cancel")
+        
+        while True:
+            ret, frame = self.cameras[0].read()
+            if not ret:
+                print("Failed to grab frame")
+                break
+                
+            # Mirror the frame (flip horizontally for more natural view)
+            frame = cv2.flip(frame, 1)
+            
+            # Draw a face positioning guide
+            height, width = frame.shape[:2]
+            center_x, center_y = width // 2, height // 2
+            cv2.rectangle(frame, (center_x - 100, center_y - 125), 
+                          (center_x + 100, center_y + 125), (0, 255, 0), 2)
+            
+            # Add instructions to the frame
+            cv2.putText(frame, "Position face in the green box", 
+                      (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(frame, "Press 'c' to capture, 'q' to cancel", 
+                      (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            
+            # Display the frame
+            cv2.imshow('New User Registration', frame)
+            
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                print("User registration cancelled")
+                cv2.destroyWindow('New User Registration')
+                return False
+                
+            elif key == ord('c'):
+                face_recognition = load_face_recognition()
+                
+                # Try to find a face in the current frame
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                face_locations = face_recognition.face_locations(rgb_frame)
+                
+                if not face_locations:
+                    print("No face detected. Please position your face clearly in the green box.")
+                    continue
+                    
+                # Take one face encoding (the first one found)
+                face_encoding = face_recognition.face_encodings(rgb_frame, face_locations)[0]
+                
+                # Ask for a name for this user
+                cv2.destroyWindow('New User Registration')
+                name = input("Enter name for this authorized user: ")
+                
+                # Save user image
+                user_image_path = os.path.join(self.authorized_dir, f"{name}.jpg")
+                top, right, bottom, left = face_locations[0]
+                # Expand the face region slightly
+                padding = 30
+                top = max(0, top - padding)
+                left = max(0, left - padding)
+                bottom = min(frame.shape[0], bottom + padding)
+                right = min(frame.shape[1], right + padding)
+                face_image = frame[top:bottom, left:right]
+                cv2.imwrite(user_image_path, face_image)
+                
+                # Add the user to authorized list
+                self.add_authorized_user(name, face_encoding, source='webcam')
+                print(f"User {name} added successfully!")
+                return True
+    
+    def face_job(self, frame, detections, camera_name=None):
+        """Resolve people from the identity cache and decide whether a face check is due.
+
+        Marks cached people in detections['authorized'] and returns (cache, now, unresolved)
+        for the person boxes that still need their faces encoded, or None.
+        """
+        # Frames without a person never pay for face recognition
+        people = np.flatnonzero(np.isin(detections['cls'], self.human_class_ids))
+        if len(people) == 0:
+            return None
+        
+        # If no authorized users are registered yet, no one can be authorized
+        if len(self.face_index) == 0:
+            return None
+        
+        # People already verified recently are recognized by box overlap, without encoding
+        cache = self.get_identity_cache(camera_name)
+        now = time.monotonic()
+        cache.expire(now)
+        unresolved = []
+        boxes = [(int(detections['x1'][index]), int(detections['y1'][index]),
+                  int(detections['x2'][index]), int(detections['y2'][index])) for index in people.tolist()]
+        thumbnails = [cache.thumbnail(frame, box) for box in boxes]
+        names = cache.lookup(boxes, thumbnails, now)
+        for index, box, thumbnail, name in zip(people.tolist(), boxes, thumbnails, names):
+            if name is not None:
+                detections['authorized'][index] = True
+                if not self.headless:
+                    cv2.putText(frame, f"Authorized: {name}", (box[0], box[1] + 15), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            else:
+                unresolved.append((index, box, thumbnail))
+        
+        if not unresolved:
+            return None
+        
+        current_time = time.time()
+        
+        # Only process face recognition periodically to save CPU
+        if current_time - self.last_face_check_time.get(camera_name, 0) < self.face_recognition_cooldown:
+            return None
+            
+        self.last_face_check_time[camera_name] = current_time
+        return cache, now, unresolved
+    
+    def encode_job_faces(self, frame, job):
+        """Find and encode faces inside each unresolved person box only"""
+        _, _, unresolved = job
+        return encode_faces(load_face_recognition(), frame, [box for _, box, _ in unresolved],
+                            self.person_crop_padding, self.person_crop_min_height,
+                            self.person_crop_max_upscale)
+    
+    def apply_faces(self, frame, detections, job, faces):
+        """Match encoded faces against the authorized users and mark their person boxes"""
+        if not faces:
+            return bool(detections['authorized'].any())
+        cache, now, unresolved = job
+        
+        # Compare all faces with all known users in one batched distance computation
+        matches = self.face_index.match([encoding for _, _, encoding in faces], tolerance=self.face_tolerance)
+        
+        for (position, (left, top, right, bottom), _), (name, distance) in zip(faces, matches):
+            # A matching face authorizes the person box it was found in, any other face rejects it
+            index, box, thumbnail = unresolved[position]
+            if name is None:
+                detections['rejected'][index] = True
+                continue
+            detections['authorized'][index] = True
+            cache.store(name, box, thumbnail, now)
+            if self.headless:
+                continue
+            
+            # Draw a green box around authorized face
+            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+            cv2.putText(frame, f"Authorized: {name}", (left, top - 10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        
+        return bool(detections['authorized'].any())
+    
+    def is_authorized(self, frame, detections, camera_name=None):
+        """Check which person boxes belong to authorized users.
+
+        Marks detections['authorized'] in place and returns True if anyone is authorized.
+        """
+        job = self.face_job(frame, detections, camera_name)
+        if job is None:
+            return bool(detections['authorized'].any())
+        return self.apply_faces(frame, detections, job, self.encode_job_faces(frame, job))
+    
+    def get_identity_cache(self, camera_name):
+        if camera_name not in self.identity_caches:
+            self.identity_caches[camera_name] = IdentityCache(self.identity_ttl, self.identity_leave_after)
+        return self.identity_caches[camera_name]
+    
+    def detect_batch(self, frames):
+        """Run YOLOv8 once on a batch of frames and return the target detections per frame"""
+        with self.latency.time('yolo'):
+            results = self.model(frames, classes=self.target_class_ids, imgsz=self.model_imgsz,
+                                 conf=self.confidence_threshold, verbose=False)
+
+        # Class and confidence filtering is done with array masks over all boxes at once
+        with self.latency.time('postprocess'):
+            return [boxes_to_detections(result.boxes, self.target_class_ids, self.confidence_threshold)
+                    for result in results]
+
+    def frame_crops(self, camera, frame):
+        """Return the (offset, image) crops of a frame YOLO should see, or [] if there is nothing to run"""
+        regions = camera.zones.layout(frame) if camera.zones is not None else None
+        if self.tiler is not None:
+            # Every tile has its own motion gate, a distant bird barely changes the whole frame
+            with self.latency.time('motion'):
+                return self.tiler.crops(camera.name, frame, self.motion_gate_enabled, regions=regions)
+
+        if self.motion_gate_enabled:
+            with self.latency.time('motion'):
+                if not camera.motion_gate.should_detect(frame):
+                    return []
+        if regions is None:
+            return [((0, 0), frame)]
+        return [((x1, y1), frame[y1:y2, x1:x2]) for x1, y1, x2, y2 in regions]
+
+    def detect_crops(self, frame_crops):
+        """Run the crops of several frames as one batched YOLO call and merge the boxes per frame"""
+        images = [image for crops in frame_crops for _, image in crops]
+        found = self.detect_batch(images)
+
+        batch_detections = []
+        position = 0
+        with self.latency.time('merge'):
+            for crops in frame_crops:
+                offsets = [offset for offset, _ in crops]
+                batch_detections.append(merge_crops(offsets, found[position:position + len(crops)],
+                                                    self.tile_merge_threshold))
+                position += len(crops)
+        return batch_detections
+
+    def detect(self, frame):
+        """Run YOLOv8 on a single frame and return the target detections"""
+        return self.detect_batch([frame])[0]
+
+    def collect_batch(self, timeout=0.5):
+        """Take the newest waiting frame from every camera, or None once all sources ended.
+
+        Older frames still queued are stale by now and count as dropped; lossless replays
+        take the oldest instead so that every frame is processed in order.
+        """
+        with self.frame_condition:
+            if not any(camera.queue.qsize() for camera in self.cameras):
+                if all(camera.queue.closed for camera in self.cameras):
+                    return None
+                self.frame_condition.wait(timeout)
+
+            batch = []
+            for camera in self.cameras:
+                item = camera.queue.get_nowait() if self.lossless else camera.queue.get_newest_nowait()
+                if item is not None:
+                    captured_at, frame = item
+                    batch.append((camera, captured_at, frame))
+            return batch
+
+    def detection_loop(self):
+        """Detection stage: one batched YOLO call across all cameras, then face checks on people"""
+        while not self.stop_event.is_set():
+            batch = self.collect_batch()
+            if batch is None:
+                break
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            if self.scheduler is not None:
+                self.scheduler.end_boost_if_due(start)
+
+            # Static frames (and frames between strides) skip YOLO and with it the face check
+            active = []
+            frame_crops = []
+            for camera, captured_at, frame in batch:
+                camera.frame_index += 1
+                crops = [] if camera.frame_index % self.frame_stride else self.frame_crops(camera, frame)
+                if not crops:
+                    self.result_queue.put((camera, captured_at, frame, None))
+                else:
+                    active.append((camera, captured_at, frame))
+                    frame_crops.append(crops)
+
+            if not active:
+                self.detection_stats.record(time.monotonic() - start)
+                continue
+
+            batch_detections = self.detect_crops(frame_crops)
+
+            # Objects outside the zones are dropped before they cost a face check or an alert
+            for index, (camera, _, _) in enumerate(active):
+                if camera.zones is not None:
+                    batch_detections[index] = camera.zones.assign(batch_detections[index])
+
+            # Face recognition only looks at the person boxes YOLO found
+            for (camera, captured_at, frame), detections in zip(active, batch_detections):
+                if self.face_recognition_enabled:
+                    with self.latency.time('face'):
+                        self.is_authorized(frame, detections, camera.name)
+                self.result_queue.put((camera, captured_at, frame, detections))
+            elapsed = time.monotonic() - start
+            self.detection_stats.record(elapsed)
+
+            if self.scheduler is not None:
+                self.scheduler.record(elapsed)
+
+        self.result_queue.close()
+
+    def draw_detection(self, frame, cls_id, conf, box, track_id, authorized):
+        """Draw bounding box with class name and track id"""
+        detected_info = self.target_classes[cls_id]
+        x1, y1, x2, y2 = (int(v) for v in box)
+        color = (0, 255, 0) if authorized else (0, 0, 255)
+        label = f"{detected_info['name']} #{track_id}"
+        if conf is not None:
+            label += f" {conf:.2f}"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, label, 
+                  (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+    def handle_detections(self, camera, frame, detections, captured_at=None):
+        """Render/alert stage: update tracks, draw boxes, raise alerts and save detections.
+
+        Returns True if the frame was handed to the detection writer.
+        """
+        now = time.monotonic()
+
+        # Frames skipped by the motion gate keep showing the objects being tracked
+        if detections is None:
+            if self.headless:
+                return False
+            with self.latency.time('draw'):
+                for track in camera.tracker.tracks:
+                    if track.missed == 0:
+                        self.draw_detection(frame, track.cls_id, None, track.box, track.track_id,
+                                            track.authorized)
+            return False
+
+        track_start = time.perf_counter()
+        track_ids, entered, left = camera.tracker.update(detections, now)
+        for track in left:
+            print(f"[{camera.name}] {self.target_classes[track.cls_id]['name']} #{track.track_id} "
+                  f"left after {track.age(now):.1f}s")
+
+        rows = list(zip(detections.tolist(), track_ids.tolist()))
+        arrived = bool(entered)  # A new object, or a tracked one stepping into another zone
+        save_classes = []
+        events = []
+        alerts = []
+        for (cls_id, conf, x1, y1, x2, y2, authorized, rejected, zone), track_id in rows:
+            detected_info = self.target_classes[cls_id]
+            detected_class = detected_info['name']
+            detected_type = detected_info['type']
+            self.detections_counter.inc(**{'class': detected_class, 'type': detected_type})
+
+            # A verified person stays authorized until a face check on their track fails;
+            # an identity cache miss only means the face is checked again
+            track = camera.tracker.get(track_id)
+            track.check_face(authorized, rejected)
+            if zone >= 0 and zone != track.zone:
+                arrived = True
+            track.zone = zone
+
+            # Only trigger alert if it's not an authorized person
+            # For humans, check authorization of this person's box
+            # For animals and birds, always alert
+            if track.authorized:
+                continue
+            if detected_type == 'human' and self.face_check_pending(track, now):
+                continue
+
+            # Alert and save once per new object, then only take periodic snapshots
+            if not track.alerted:
+                track.alerted = True
+                track.last_saved = now
+                zone_name = camera.zones.zone_name(zone) if camera.zones is not None else None
+                alerts.append(Alert(detected_type, detected_class, camera.name, conf, (x1, y1, x2, y2),
+                                    track_id, zone_name, captured_at=captured_at))
+                if self.clips is not None:
+                    self.clips.trigger(camera.name, detected_class, now)
+                save_classes.append(detected_class)
+                events.append(('alert', detected_class, detected_type, conf, (x1, y1, x2, y2), track_id, zone))
+            elif self.snapshot_interval and now - track.last_saved >= self.snapshot_interval:
+                track.last_saved = now
+                save_classes.append(detected_class)
+                events.append(('snapshot', detected_class, detected_type, conf, (x1, y1, x2, y2), track_id, zone))
+        self.latency.record('track', time.perf_counter() - track_start)
+
+        # Something new in view earns a few seconds of full effort; objects that stay put don't
+        if arrived and self.scheduler is not None:
+            self.scheduler.boost()
+
+        # Headless units only draw boxes on the frames they keep
+        if not self.headless or save_classes:
+            with self.latency.time('draw'):
+                for (cls_id, conf, x1, y1, x2, y2, _, _, zone), track_id in rows:
+                    self.draw_detection(frame, cls_id, conf, (x1, y1, x2, y2), track_id,
+                                        camera.tracker.get(track_id).authorized)
+
+        # One image per frame, however many objects asked for it
+        if save_classes:
+            with self.latency.time('save'):
+                image_path = self.save_detection(frame, "-".join(sorted(set(save_classes))),
+                                                 camera.name if len(self.cameras) > 1 else None)
+            self.record_events(camera, events, image_path)
+            for alert in alerts:
+                alert.image = image_path
+                self.raise_alert(alert)
+            return True
+        return False
+
+    def face_check_pending(self, track, now):
+        """True while a new person may still be verified, so the human alert waits for their face"""
+        if not self.face_recognition_enabled or len(self.face_index) == 0 or track.rejected:
+            return False
+        return track.age(now) < self.face_grace_checks * self.face_recognition_cooldown
+
+    def record_events(self, camera, events, image_path):
+        """Add the alerts and snapshots of one frame to the event store"""
+        timestamp = time.time()
+        for kind, detected_class, detected_type, conf, box, track_id, zone in events:
+            zone_name = camera.zones.zone_name(zone) if camera.zones is not None else None
+            self.events.record(timestamp, camera.name, detected_class, detected_type, kind, conf, box,
+                               track_id, zone_name, image_path)
+
+    def authorized_person_present(self, camera, detections):
+        """True if any person currently shown for this camera is authorized"""
+        if detections is None:
+            return any(track.authorized for track in camera.tracker.tracks if track.missed == 0)
+        return bool(detections['authorized'].any())
+
+    def draw_overlay(self, camera, frame, authorized_person_present, latency):
+        """Add title, status and instructions to the frame"""
+        title = "Enhanced Farm Security System"
+        if len(self.cameras) > 1:
+            title += f" [{camera.name}]"
+        if camera.zones is not None:
+            camera.zones.draw(frame)
+        cv2.putText(frame, title, 
+                  (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+
+        auth_status = "Authorized User: YES" if authorized_person_present else "Authorized User: NO"
+        cv2.putText(frame, auth_status, 
+                  (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+
+        cv2.putText(frame, "Press 'a' to add authorized user, 'q' to quit", 
+                  (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+
+        cv2.putText(frame, f"Latency: {latency * 1000:.0f} ms", 
+                  (10, 115), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+
+    def window_name(self, camera):
+        if len(self.cameras) > 1:
+            return f'Farm Security System - {camera.name}'
+        return 'Farm Security System'
+
+    def run(self):
+        """Main function to run the detection system"""
+        print("Starting Enhanced Farm Security System...")
+        print(f"Watching {len(self.cameras)} camera(s): " + ", ".join(
+            f"{camera.name}={camera.source}" for camera in self.cameras))
+        if self.display:
+            print("Press 'a' to add authorized user")
+            print("Press 'q' to quit")
+
+        # Stages are linked by small queues that drop the oldest frame, so a
+        # slow detector never lets stale frames pile up behind it
+        self.stop_event = threading.Event()
+        self.result_queue = DropOldestQueue(self.queue_size * len(self.cameras), block=self.lossless,
+                                            on_drop=lambda item: self.release_frame(item[2]))
+        self.detection_stats = StageStats('detection')
+        self.render_stats = StageStats('render')
+        self.frames_processed = 0
+        queues = {camera.name: camera.queue for camera in self.cameras}
+        queues['result'] = self.result_queue
+        extras = {'alerts': self.alerts, 'writer': self.writer, 'storage': self.retention, 'events': self.events}
+        if self.clips is not None:
+            extras['clips'] = self.clips
+        if self.scheduler is not None:
+            extras['scheduler'] = self.scheduler
+        if self.tiler is not None:
+            extras['tiles'] = self.tiler
+        if self.pipeline is not None:
+            extras['processes'] = self.pipeline
+        for camera in self.cameras:
+            if camera.zones is not None:
+                extras[f"zones[{camera.name}]"] = camera.zones
+            if self.motion_gate_enabled and self.tiler is None:
+                extras[f"motion[{camera.name}]"] = camera.motion_gate
+            if self.face_recognition_enabled:
+                extras[f"identity[{camera.name}]"] = self.get_identity_cache(camera.name)
+        reporter = PipelineReporter(
+            [camera.stats for camera in self.cameras] + [self.detection_stats, self.render_stats],
+            queues,
+            interval=self.stats_interval,
+            extras=extras
+        )
+
+        metrics_server = None
+        if self.metrics_port is not None:
+            try:
+                metrics_server = MetricsServer(self.metrics, self.metrics_port)
+                metrics_server.start()
+            except OSError as e:
+                print(f"Could not start metrics endpoint on port {self.metrics_port}: {e}")
+                metrics_server = None
+
+        # A service manager stops the daemon with SIGTERM; finish cleanly like 'q'
+        if self.headless and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop_event.set())
+
+        if self.display and self.tiler is not None:
+            # Full-resolution frames don't fit on screen, let the windows scale them
+            for camera in self.cameras:
+                cv2.namedWindow(self.window_name(camera), cv2.WINDOW_NORMAL)
+
+        threads = []
+        for camera in self.cameras:
+            threads.append(threading.Thread(target=camera.capture_loop, args=(self.stop_event,),
+                                            name=f'capture-{camera.name}', daemon=True))
+        detection_loop = self.detection_loop
+        if self.pipeline is not None:
+            self.pipeline.start()
+            detection_loop = self.pipeline.detection_loop
+        threads.append(threading.Thread(target=detection_loop, name='detection', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self.stop_event.is_set():
+                item = self.result_queue.get(timeout=0.5)
+                if item is None:
+                    if self.result_queue.closed:
+                        break
+                    # Keep the window responsive while waiting for the detector
+                    if self.display and cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                    continue
+
+                camera, captured_at, frame, detections = item
+                start = time.monotonic()
+
+                saved = self.handle_detections(camera, frame, detections, captured_at)
+                authorized_person_present = self.authorized_person_present(camera, detections)
+                self.frames_processed += 1
+                self.frames_counter.inc(camera=camera.name)
+                if self.clips is not None:
+                    self.clips.add(camera.name, frame, captured_at)
+                if not self.display:
+                    self.release_frame(frame)
+                    self.render_stats.record(time.monotonic() - start)
+                    reporter.maybe_report()
+                    continue
+                source_frame = frame
+
+                if saved:
+                    # The writer owns the saved frame now, draw the overlay on a copy
+                    frame = frame.copy()
+                with self.latency.time('overlay'):
+                    self.draw_overlay(camera, frame, authorized_person_present, time.monotonic() - captured_at)
+
+                # Display the resulting frame
+                with self.latency.time('display'):
+                    cv2.imshow(self.window_name(camera), frame)
+                self.release_frame(source_frame)
+                self.render_stats.record(time.monotonic() - start)
+                reporter.maybe_report()
+
+                # Check for key press
+                key = cv2.waitKey(1) & 0xFF
+
+                # Add authorized user
+                if key == ord('a'):
+                    self.cameras[0].paused.set()
+                    try:
+                        self.add_new_user_mode()
+                    finally:
+                        self.cameras[0].paused.clear()
+
+                # Exit on 'q' press
+                elif key == ord('q'):
+                    break
+
+        finally:
+            # Stop the worker threads, then release the cameras and close windows
+            self.stop_event.set()
+            with self.frame_condition:
+                self.frame_condition.notify_all()
+            self.result_queue.close()
+            for thread in threads:
+                thread.join(timeout=2)
+            # Frames that were never rendered still hold their shared memory slots
+            item = self.result_queue.get_nowait()
+            while item is not None:
+                self.release_frame(item[2])
+                item = self.result_queue.get_nowait()
+            for camera in self.cameras:
+                camera.release()
+            self.alerts.close()
+            self.writer.close()
+            self.events.close()
+            self.retention.close()
+            if self.clips is not None:
+                self.clips.close()
+            if self.pipeline is not None:
+                self.pipeline.stop()
+            if metrics_server is not None:
+                metrics_server.stop()
+            if self.display:
+                cv2.destroyAllWindows()
+            print("Farm Security System stopped")
+    
+    def release_frame(self, frame):
+        """Hand a shared memory frame slot back to the ring once the frame was rendered"""
+        if self.pipeline is not None:
+            self.pipeline.release(frame)
+    
+    def __del__(self):
+        # Ensure resources are released
+        for camera in getattr(self, 'cameras', []):
+            camera.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enhanced Farm Security System")
+    parser.add_argument('--source', action='append', dest='sources',
+                        help="Camera index, video file or stream URL (repeat for several cameras)")
+    parser.add_argument('--metrics-port', type=int, default=9108,
+                        help="Local port for the Prometheus metrics endpoint (default 9108)")
+    parser.add_argument('--no-metrics', action='store_true', help="Don't serve metrics")
+    parser.add_argument('--headless', action='store_true',
+                        help="Run as a service without window or overlays, reconnecting lost cameras")
+    parser.add_argument('--model', default='yolov8n.pt', help="YOLOv8 weights (default yolov8n.pt)")
+    parser.add_argument('--target-fps', type=float, default=None,
+                        help="Adapt frame stride, input size and face checks to hold this detection rate")
+    parser.add_argument('--tiled', action='store_true',
+                        help="Capture at full resolution and detect on overlapping tiles (small, distant objects)")
+    parser.add_argument('--zones', help="JSON file with polygon zones per camera (cam0, cam1, ...)")
+    parser.add_argument('--backend', choices=BACKENDS, default='torch',
+                        help="Detector runtime: PyTorch, or an exported ONNX Runtime / OpenVINO model")
+    parser.add_argument('--int8', action='store_true',
+                        help="Quantize the exported model to int8, calibrated on stored detection images")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="Run detection in this many worker processes fed through shared memory (0 = off)")
+    parser.add_argument('--clip-seconds', type=float, nargs=2, default=(5.0, 10.0), metavar=('BEFORE', 'AFTER'),
+                        help="Save a clip from this many seconds before to after each alert (default 5 10)")
+    parser.add_argument('--clip-buffer-mb', type=float, default=32,
+                        help="Memory for the compressed pre-event frames of all cameras (default 32, 0 = no clips)")
+    parser.add_argument('--webhook', help="POST every alert as JSON to this URL")
+    parser.add_argument('--storage-gb', type=float, default=2.0,
+                        help="Disk budget for detection images and clips; the oldest are shrunk, then deleted (default 2)")
+    args = parser.parse_args()
+    
+    security_system = EnhancedFarmSecuritySystem(sources=args.sources,
+                                                 metrics_port=None if args.no_metrics else args.metrics_port,
+                                                 headless=args.headless, model_path=args.model,
+                                                 target_fps=args.target_fps, tiled=args.tiled,
+                                                 zones_path=args.zones, processes=args.processes,
+                                                 backend=args.backend, int8=args.int8,
+                                                 clip_seconds=args.clip_seconds, clip_buffer_mb=args.clip_buffer_mb,
+                                                 storage_gb=args.storage_gb, webhook_url=args.webhook)
     security_system.run()
\ No newline at end of file
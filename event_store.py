@@ -0,0 +1,253 @@
+import argparse
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from image_retention import resolve_image
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL,
+    class TEXT NOT NULL,
+    type TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    track INTEGER,
+    zone TEXT,
+    image TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_class_ts ON events (class, ts);
+CREATE INDEX IF NOT EXISTS events_camera_ts ON events (camera, ts);
+"""
+
+COLUMNS = ('ts', 'camera', 'class', 'type', 'kind', 'confidence', 'x1', 'y1', 'x2', 'y2', 'track', 'zone', 'image')
+FILTERS = ('camera', 'class', 'type', 'kind', 'zone')
+INSERT = 'INSERT INTO events ("{}") VALUES ({})'.format('", "'.join(COLUMNS), ', '.join('?' * len(COLUMNS)))
+
+BUCKETS = {'minute': 60, 'hour': 3600, 'day': 86400, 'week': 7 * 86400}
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=10.0)
+    connection.execute('PRAGMA journal_mode=WAL')
+    # WAL keeps a committed batch safe across crashes without syncing on every commit
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def where_clause(start=None, end=None, **filters):
+    """SQL condition and parameters for a time range plus equality filters (None = any)"""
+    conditions, params = [], []
+    if start is not None:
+        conditions.append('ts >= ?')
+        params.append(start)
+    if end is not None:
+        conditions.append('ts < ?')
+        params.append(end)
+    for column in FILTERS:
+        value = filters.get(column)
+        if value is not None:
+            conditions.append(f'"{column}" = ?')
+            params.append(value)
+    return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+
+class EventStore:
+    """Detection events in SQLite (WAL mode), written in batches by a background thread.
+
+    record() only queues the event, so the render loop never waits for the disk. Queries
+    open their own connection and can run from any thread or process while writing goes on.
+    """
+
+    def __init__(self, path, batch_size=256, flush_interval=1.0, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # Longest an event waits before being committed
+        self.pending = queue.Queue(maxsize=max_pending)
+
+        # Statistics
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with connect(path) as connection:
+            connection.executescript(SCHEMA)
+        self.thread = threading.Thread(target=self.writer_loop, name='event-store', daemon=True)
+        self.thread.start()
+
+    def record(self, timestamp, camera, detected_class, detected_type, kind, confidence, box,
+               track=None, zone=None, image=None):
+        """Queue one detection event; dropped (and counted) if the writer is far behind"""
+        x1, y1, x2, y2 = box
+        try:
+            self.pending.put_nowait((timestamp, camera, detected_class, detected_type, kind, confidence,
+                                     x1, y1, x2, y2, track, zone, image))
+        except queue.Full:
+            self.dropped += 1
+
+    def writer_loop(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            try:
+                item = self.pending.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if item is None:
+                running = False
+            if not batch:
+                continue
+            try:
+                with connection:
+                    connection.executemany(INSERT, batch)
+                self.written += len(batch)
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.failed += len(batch)
+                print(f"Error writing {len(batch)} detection events: {e}")
+        connection.close()
+
+    def pending_count(self):
+        return self.pending.qsize()
+
+    def close(self, timeout=5.0):
+        """Commit the queued events, then stop the writer thread"""
+        self.pending.put(None)
+        self.thread.join(timeout)
+
+    def summary(self):
+        return (f"{self.written} events in {self.batches} batches, {self.dropped} dropped, "
+                f"{self.failed} failed, {self.pending_count()} pending")
+
+
+class EventQuery:
+    """Read side of the event store: counts, histograms and event lookups"""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No event store at {path}")
+        self.connection = connect(path)
+
+    def count(self, start=None, end=None, group_by=None, **filters):
+        """Number of events, or {value: count} when grouped by a column such as 'class'"""
+        where, params = where_clause(start, end, **filters)
+        if group_by is None:
+            return self.connection.execute(f'SELECT COUNT(*) FROM events{where}', params).fetchone()[0]
+        if group_by not in FILTERS:
+            raise ValueError(f"Can't group by {group_by}, expected one of {', '.join(FILTERS)}")
+        rows = self.connection.execute(f'SELECT "{group_by}", COUNT(*) FROM events{where} '
+                                       f'GROUP BY "{group_by}" ORDER BY COUNT(*) DESC', params)
+        return {value: count for value, count in rows}
+
+    def histogram(self, bucket=3600, start=None, end=None, **filters):
+        """[(bucket start timestamp, count)] for buckets of `bucket` seconds (local time aligned)"""
+        offset = datetime.now().astimezone().utcoffset().total_seconds()
+        where, params = where_clause(start, end, **filters)
+        rows = self.connection.execute(
+            f'SELECT CAST((ts + ?) / ? AS INTEGER) AS bucket, COUNT(*) FROM events{where} '
+            f'GROUP BY bucket ORDER BY bucket', [offset, bucket] + params)
+        return [(index * bucket - offset, count) for index, count in rows]
+
+    def events(self, start=None, end=None, limit=100, newest_first=True, **filters):
+        """Matching events as dicts, newest first by default.
+
+        'image' is where the saved frame is now: retention may have replaced it with a
+        thumbnail since, and it is None once the image was deleted.
+        """
+        where, params = where_clause(start, end, **filters)
+        order = 'DESC' if newest_first else 'ASC'
+        rows = self.connection.execute(f'SELECT * FROM events{where} ORDER BY ts {order} LIMIT ?',
+                                       params + [limit])
+        events = [dict(row) for row in rows]
+        for event in events:
+            event['image'] = resolve_image(event['image'])
+        return events
+
+    def close(self):
+        self.connection.close()
+
+
+def parse_time(value, now=None):
+    """Absolute time from '7d' / '12h' / '30m' ago, or an ISO date/time"""
+    if value is None:
+        return None
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhdw])', value)
+    if match:
+        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+        return (now or time.time()) - float(match.group(1)) * units[match.group(2)]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def add_filter_arguments(parser, **defaults):
+    """--since, --until and one option per filter column"""
+    parser.add_argument('--since', help="Start: 7d, 12h, 30m ago or an ISO date/time", **defaults)
+    parser.add_argument('--until', help="End, same formats as --since", **defaults)
+    for column in FILTERS:
+        parser.add_argument(f'--{column}', help=f"Only events with this {column}", **defaults)
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Query the detection event store")
+    parser.add_argument('--db', default=os.path.join(current_dir, 'detected_images', 'events.db'),
+                        help="Event database (default detected_images/events.db)")
+    # Filters go before or after the command; the command's copies only set what was given
+    add_filter_arguments(parser)
+    filters_parser = argparse.ArgumentParser(add_help=False)
+    add_filter_arguments(filters_parser, default=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest='command', required=True)
+    count_parser = commands.add_parser('count', parents=[filters_parser], help="Number of matching events")
+    count_parser.add_argument('--by', choices=FILTERS, help="Count per camera, class, ...")
+    histogram_parser = commands.add_parser('histogram', parents=[filters_parser],
+                                           help="Matching events per time bucket")
+    histogram_parser.add_argument('--bucket', choices=BUCKETS, default='hour')
+    list_parser = commands.add_parser('list', parents=[filters_parser], help="Most recent matching events")
+    list_parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = EventQuery(args.db)
+    filters = {column: getattr(args, column) for column in FILTERS}
+    span = dict(start=parse_time(args.since), end=parse_time(args.until))
+    if args.command == 'count':
+        result = store.count(group_by=args.by, **span, **filters)
+        if isinstance(result, dict):
+            for value, count in result.items():
+                print(f"{value:<12} {count}")
+        else:
+            print(result)
+    elif args.command == 'histogram':
+        for bucket_start, count in store.histogram(BUCKETS[args.bucket], **span, **filters):
+            print(f"{format_time(bucket_start)}  {count:>7}")
+    else:
+        for event in store.events(limit=args.limit, **span, **filters):
+            print(f"{format_time(event['ts'])}  {event['camera']:<6} {event['class']:<8} {event['kind']:<8} "
+                  f"{event['confidence']:.2f}  #{event['track']}  {event['zone'] or '-'}  {event['image'] or ''}")
+    store.close()
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
@@ -0,0 +1,43 @@
+import cv2
+
+
+def crop_person(frame, box, padding=0.1, min_height=240, max_upscale=3.0):
+    """Cut a padded person box out of the frame, upscaled so small faces can still be found"""
+    x1, y1, x2, y2 = box
+    pad_x = int((x2 - x1) * padding)
+    pad_y = int((y2 - y1) * padding)
+    left, top = max(0, x1 - pad_x), max(0, y1 - pad_y)
+    right, bottom = min(frame.shape[1], x2 + pad_x), min(frame.shape[0], y2 + pad_y)
+    crop = frame[top:bottom, left:right]
+
+    scale = 1.0
+    if crop.size and crop.shape[0] < min_height:
+        scale = min(max_upscale, min_height / crop.shape[0])
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    return crop, (left, top), scale
+
+
+def encode_faces(face_recognition, frame, boxes, padding=0.1, min_height=240, max_upscale=3.0):
+    """Find and encode the faces inside person boxes.
+
+    Returns (position of the box in `boxes`, face box in frame coordinates, encoding) per face.
+    """
+    faces = []
+    for position, box in enumerate(boxes):
+        crop, (offset_x, offset_y), scale = crop_person(frame, box, padding, min_height, max_upscale)
+        if crop.size == 0:
+            continue
+
+        # Convert the image from BGR to RGB (face_recognition uses RGB)
+        rgb_crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        face_locations = face_recognition.face_locations(rgb_crop)
+        if not face_locations:
+            continue
+
+        for (top, right, bottom, left), face_encoding in zip(
+                face_locations, face_recognition.face_encodings(rgb_crop, face_locations)):
+            # Map the face back to frame coordinates for drawing
+            face_box = (int(left / scale) + offset_x, int(top / scale) + offset_y,
+                        int(right / scale) + offset_x, int(bottom / scale) + offset_y)
+            faces.append((position, face_box, face_encoding))
+    return faces
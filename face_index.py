@@ -0,0 +1,92 @@
+import threading
+
+import cv2
+import numpy as np
+
+ENCODING_SIZE = 128  # Length of a face_recognition (dlib) face encoding
+
+
+class FaceIndex:
+    """Known face encodings kept in one contiguous float32 matrix for batched matching"""
+
+    def __init__(self, ann_threshold=1000, ann_checks=64):
+        self.ann_threshold = ann_threshold  # Switch to an approximate index above this many users
+        self.ann_checks = ann_checks  # FLANN search effort, higher is more accurate but slower
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.matrix = np.empty((16, ENCODING_SIZE), dtype=np.float32)
+            self.count = 0
+            self.names = []
+            self.ann_index = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def encodings(self):
+        """The used rows of the encoding matrix (a view, not a copy)"""
+        return self.matrix[:self.count]
+
+    def set(self, encodings, names):
+        """Replace the whole index"""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        with self.lock:
+            self.matrix = np.ascontiguousarray(encodings).copy() if len(encodings) else \
+                np.empty((16, ENCODING_SIZE), dtype=np.float32)
+            self.count = len(encodings)
+            self.names = list(names)
+            self.ann_index = None
+
+    def add(self, name, encoding):
+        """Append one user, growing the matrix geometrically so appends stay cheap"""
+        with self.lock:
+            if self.count == len(self.matrix):
+                grown = np.empty((max(16, 2 * len(self.matrix)), ENCODING_SIZE), dtype=np.float32)
+                grown[:self.count] = self.matrix[:self.count]
+                self.matrix = grown
+            self.matrix[self.count] = np.asarray(encoding, dtype=np.float32)
+            self.count += 1
+            self.names.append(name)
+            self.ann_index = None
+
+    def build_ann_index(self):
+        """Build an OpenCV FLANN kd-tree over the current encodings"""
+        index = cv2.flann_Index()
+        index.build(np.ascontiguousarray(self.matrix[:self.count]),
+                    dict(algorithm=1, trees=4))  # 1 = FLANN_INDEX_KDTREE
+        return index
+
+    def nearest(self, face_encodings):
+        """Return (index, distance) of the closest known face for every query encoding"""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        with self.lock:
+            if self.count == 0 or len(queries) == 0:
+                return np.full(len(queries), -1), np.full(len(queries), np.inf, dtype=np.float32)
+
+            if self.count >= self.ann_threshold:
+                if self.ann_index is None:
+                    self.ann_index = self.build_ann_index()
+                indices, squared = self.ann_index.knnSearch(queries, 1, params=dict(checks=self.ann_checks))
+                return indices[:, 0].astype(np.int64), np.sqrt(np.maximum(squared[:, 0], 0))
+
+            # All faces against all users in one go: |a - b|^2 = |a|^2 + |b|^2 - 2ab
+            known = self.matrix[:self.count]
+            squared = ((queries ** 2).sum(axis=1)[:, None] + (known ** 2).sum(axis=1)[None, :]
+                       - 2.0 * queries @ known.T)
+            indices = np.argmin(squared, axis=1)
+            distances = np.sqrt(np.maximum(squared[np.arange(len(queries)), indices], 0))
+            return indices, distances
+
+    def match(self, face_encodings, tolerance=0.6):
+        """Return (name or None, distance) for every query encoding"""
+        indices, distances = self.nearest(face_encodings)
+        matches = []
+        for index, distance in zip(indices.tolist(), distances.tolist()):
+            if index >= 0 and distance <= tolerance:
+                matches.append((self.names[index], distance))
+            else:
+                matches.append((None, distance))
+        return matches
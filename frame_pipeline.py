@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class DropOldestQueue:
+    """Bounded queue that discards the oldest item instead of blocking the producer.
+
+    With block=True the producer waits for space instead, which offline replays use
+    so that every frame is processed. on_drop is called with every discarded item, for
+    items holding a resource (such as a shared memory frame slot) that must be freed.
+    """
+
+    def __init__(self, maxsize=2, condition=None, block=False, on_drop=None):
+        self.maxsize = maxsize
+        self.block = block
+        self.on_drop = on_drop
+        self.items = deque()
+        self.dropped = 0
+        self.closed = False
+        # Several queues can share one condition so a consumer can wait on all of them
+        self.condition = condition if condition is not None else threading.Condition()
+
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full"""
+        dropped = None
+        with self.condition:
+            while self.block and len(self.items) >= self.maxsize and not self.closed:
+                self.condition.wait(0.5)
+            if len(self.items) >= self.maxsize:
+                dropped = self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify_all()
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        """Return the oldest item, or None on timeout / once closed and empty"""
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if self.items:
+                item = self.items.popleft()
+                self.condition.notify_all()
+                return item
+            return None
+
+    def get_nowait(self):
+        """Return the oldest item without waiting, or None if empty"""
+        with self.condition:
+            if self.items:
+                item = self.items.popleft()
+                self.condition.notify_all()
+                return item
+            return None
+
+    def get_newest_nowait(self):
+        """Return the newest item without waiting, dropping the older ones, or None if empty"""
+        with self.condition:
+            if not self.items:
+                return None
+            item = self.items.pop()
+            skipped = list(self.items)
+            self.items.clear()
+            self.dropped += len(skipped)
+            self.condition.notify_all()
+        if self.on_drop is not None:
+            for dropped in skipped:
+                self.on_drop(dropped)
+        return item
+
+    def close(self):
+        """Wake up any waiting consumer so it can exit"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def qsize(self):
+        with self.condition:
+            return len(self.items)
+
+
+class StageStats:
+    """Per-stage throughput and latency counters"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy_time = 0.0
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def record(self, elapsed):
+        """Record one processed item that took `elapsed` seconds"""
+        with self.lock:
+            self.count += 1
+            self.window_count += 1
+            self.busy_time += elapsed
+
+    def snapshot(self):
+        """Return (fps since last snapshot, average ms per item) and reset the window"""
+        with self.lock:
+            now = time.monotonic()
+            window = max(now - self.window_start, 1e-6)
+            fps = self.window_count / window
+            avg_ms = (self.busy_time / self.count * 1000) if self.count else 0.0
+            self.window_start = now
+            self.window_count = 0
+        return fps, avg_ms
+
+
+class LatencyRecorder:
+    """Keeps recent latency samples per stage for percentile reports"""
+
+    def __init__(self, max_samples=10000, histogram=None):
+        self.max_samples = max_samples
+        self.histogram = histogram  # Optional metrics.Histogram fed with every sample
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            if stage not in self.samples:
+                self.samples[stage] = deque(maxlen=self.max_samples)
+                self.counts[stage] = 0
+            self.samples[stage].append(seconds)
+            self.counts[stage] += 1
+        if self.histogram is not None:
+            self.histogram.observe(seconds, stage=stage)
+
+    @contextmanager
+    def time(self, stage):
+        """Record how long the body of a with-block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def report(self):
+        """Return count, mean and percentiles (in milliseconds) for every stage"""
+        with self.lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self.samples.items()}
+            counts = dict(self.counts)
+
+        report = {}
+        for stage, values in samples.items():
+            if not len(values):
+                continue
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            report[stage] = {
+                'count': counts[stage],
+                'mean_ms': round(float(values.mean()), 3),
+                'p50_ms': round(float(p50), 3),
+                'p90_ms': round(float(p90), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(values.max()), 3),
+            }
+        return report
+
+
+class PipelineReporter:
+    """Print the throughput of every stage at a fixed interval"""
+
+    def __init__(self, stages, queues, interval=10.0, extras=None):
+        self.stages = stages
+        self.queues = queues
+        self.extras = extras or {}  # Other components that provide a summary() line
+        self.interval = interval
+        self.last_report = time.monotonic()
+
+    def maybe_report(self):
+        now = time.monotonic()
+        if now - self.last_report < self.interval:
+            return
+        self.last_report = now
+
+        parts = []
+        for stage in self.stages:
+            fps, avg_ms = stage.snapshot()
+            parts.append(f"{stage.name}: {fps:.1f} fps ({avg_ms:.1f} ms)")
+        for name, q in self.queues.items():
+            parts.append(f"{name} queue: {q.qsize()} waiting, {q.dropped} dropped")
+        for name, component in self.extras.items():
+            parts.append(f"{name}: {component.summary()}")
+        print("[pipeline] " + " | ".join(parts))
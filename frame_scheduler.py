@@ -0,0 +1,109 @@
+import time
+
+# Effort levels from best quality to cheapest. Each level processes every
+# `stride`-th frame, runs YOLO at `imgsz` and checks faces every `face_interval` seconds.
+DEFAULT_LEVELS = (
+    {'stride': 1, 'imgsz': 640, 'face_interval': 1.0},
+    {'stride': 1, 'imgsz': 480, 'face_interval': 1.0},
+    {'stride': 2, 'imgsz': 480, 'face_interval': 2.0},
+    {'stride': 2, 'imgsz': 320, 'face_interval': 2.0},
+    {'stride': 3, 'imgsz': 320, 'face_interval': 4.0},
+)
+
+
+class AdaptiveScheduler:
+    """Adjusts frame stride, YOLO input size and face check rate to hold a target FPS"""
+
+    def __init__(self, target_fps, levels=DEFAULT_LEVELS, smoothing=0.2, headroom=0.7,
+                 min_dwell=3.0, boost_duration=5.0, on_change=None):
+        self.budget = 1.0 / target_fps  # Seconds one detection run may take
+        self.levels = levels
+        self.smoothing = smoothing  # Weight of the newest sample in the moving average
+        self.headroom = headroom  # Step back up once cost is below this share of the budget
+        self.min_dwell = min_dwell  # Seconds to stay on a level before changing again
+        self.boost_duration = boost_duration  # Seconds of full effort after a new object appears
+        self.on_change = on_change  # Called with the new settings after every change
+
+        self.level = 0
+        self.cost = None
+        self.last_change = time.monotonic()
+        self.boost_until = 0.0
+        self.adjustments = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.active_level()]
+
+    def active_level(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        return 0 if now < self.boost_until else self.level
+
+    def describe(self, level):
+        settings = self.levels[level]
+        return (f"stride {settings['stride']}, imgsz {settings['imgsz']}, "
+                f"faces every {settings['face_interval']:.1f}s")
+
+    def change(self, old_level, new_level, reason, apply=True):
+        self.adjustments += 1
+        if not apply:
+            print(f"[scheduler] level {old_level} -> {new_level} once the boost ends ({reason})")
+            return
+        print(f"[scheduler] level {old_level} -> {new_level} ({reason}): {self.describe(new_level)}")
+        if self.on_change is not None:
+            self.on_change(self.levels[new_level])
+
+    def record(self, elapsed, now=None):
+        """Feed the duration of one detection run and adjust the level if needed"""
+        if now is None:
+            now = time.monotonic()
+        if self.cost is None:
+            self.cost = elapsed
+        else:
+            self.cost += self.smoothing * (elapsed - self.cost)
+
+        if now - self.last_change < self.min_dwell:
+            return
+
+        # Boosted runs cost at least as much as the underlying level would, so the level
+        # still follows them (without taking effect) and is right when the boost ends
+        boosted = now < self.boost_until
+
+        old_level = self.level
+        if self.cost > self.budget and self.level < len(self.levels) - 1:
+            self.level += 1
+            reason = f"cost {self.cost * 1000:.0f} ms > budget {self.budget * 1000:.0f} ms"
+        elif self.cost < self.budget * self.headroom and self.level > 0:
+            self.level -= 1
+            reason = f"cost {self.cost * 1000:.0f} ms, headroom under {self.budget * 1000:.0f} ms"
+        else:
+            return
+
+        self.last_change = now
+        self.change(old_level, self.level, reason, apply=not boosted)
+
+    def boost(self, now=None):
+        """Switch to full effort for a few seconds, e.g. when a new object appears"""
+        if now is None:
+            now = time.monotonic()
+        was_boosted = now < self.boost_until
+        self.boost_until = now + self.boost_duration
+        if not was_boosted and self.level > 0:
+            self.change(self.level, 0, "boost for a new object")
+
+    def end_boost_if_due(self, now=None):
+        """Return to the measured level once the boost is over"""
+        if now is None:
+            now = time.monotonic()
+        if self.boost_until and now >= self.boost_until:
+            self.boost_until = 0.0
+            self.last_change = now
+            self.cost = None  # Boosted runs were at full effort, judge the level afresh
+            if self.level > 0:
+                self.change(0, self.level, "boost finished")
+
+    def summary(self):
+        cost = f"{self.cost * 1000:.0f} ms" if self.cost is not None else "n/a"
+        boosted = " (boosted)" if time.monotonic() < self.boost_until else ""
+        return (f"level {self.active_level()}{boosted}, cost {cost} / budget {self.budget * 1000:.0f} ms, "
+                f"{self.adjustments} adjustments")
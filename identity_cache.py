@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+from detections import box_iou
+
+
+class CachedIdentity:
+    """An authorized person remembered by their box position and head appearance"""
+
+    def __init__(self, name, box, thumbnail, now):
+        self.name = name
+        self.box = box
+        self.thumbnail = thumbnail
+        self.verified_at = now
+        self.last_seen = now
+
+
+class IdentityCache:
+    """Keeps positive authorizations per person so faces are not re-encoded every check"""
+
+    def __init__(self, ttl=30.0, leave_after=10.0, iou_threshold=0.3, change_threshold=25.0):
+        self.ttl = ttl  # Re-verify the face after this many seconds even if nothing changed
+        self.leave_after = leave_after  # Forget a person not seen for this many seconds
+        self.iou_threshold = iou_threshold  # Box overlap needed to treat a box as the same person
+        # Mean grey level change (0-255) of the head that forces a re-check. A miss only queues
+        # one face encoding and doesn't clear the track's authorization, so this errs low
+        self.change_threshold = change_threshold
+        self.entries = []
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def thumbnail(frame, box):
+        """Tiny grayscale copy of the head region (top third of the person box)"""
+        x1, y1, x2, y2 = box
+        head = frame[max(0, y1):max(y1 + 1, y1 + (y2 - y1) // 3), max(0, x1):max(x1 + 1, x2)]
+        if head.size == 0:
+            return None
+        gray = cv2.cvtColor(head, cv2.COLOR_BGR2GRAY) if head.ndim == 3 else head
+        return cv2.resize(gray, (16, 16), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def expire(self, now):
+        """Drop people who left the view or whose verification is too old"""
+        kept = []
+        for entry in self.entries:
+            if now - entry.last_seen > self.leave_after or now - entry.verified_at > self.ttl:
+                self.expired += 1
+                continue
+            kept.append(entry)
+        self.entries = kept
+
+    def lookup(self, boxes, thumbnails, now):
+        """Return the cached name for each person box of a frame, None where the face must be checked.
+
+        Entries and boxes are paired one-to-one, highest overlap first, so a cached person
+        can't also authorize someone standing right next to them.
+        """
+        names = [None] * len(boxes)
+        if self.entries and len(boxes):
+            ious = box_iou(np.array([entry.box for entry in self.entries]), np.array(boxes))
+            ious[ious < self.iou_threshold] = 0
+            while ious.size and ious.max() > 0:
+                e, b = np.unravel_index(np.argmax(ious), ious.shape)
+                entry = self.entries[e]
+                if self.changed(entry.thumbnail, thumbnails[b]):
+                    # The head at its best-matching box changed: re-check instead of trying other boxes
+                    ious[e, :] = 0
+                    continue
+                entry.box = boxes[b]
+                entry.last_seen = now
+                names[b] = entry.name
+                ious[e, :] = 0
+                ious[:, b] = 0
+
+        hits = sum(name is not None for name in names)
+        self.hits += hits
+        self.misses += len(names) - hits
+        return names
+
+    def changed(self, old, new):
+        if old is None or new is None:
+            return True
+        return float(np.mean(np.abs(old - new))) > self.change_threshold
+
+    def store(self, name, box, thumbnail, now):
+        """Remember a freshly verified person"""
+        self.entries = [entry for entry in self.entries
+                        if box_iou([entry.box], [box])[0, 0] < self.iou_threshold]
+        self.entries.append(CachedIdentity(name, box, thumbnail, now))
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self):
+        return (f"{len(self.entries)} cached, {self.hits} hits, {self.misses} misses "
+                f"({self.hit_ratio():.0%} hit), {self.expired} expired")
@@ -0,0 +1,224 @@
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from camera_sources import IMAGE_EXTENSIONS
+
+THUMBNAIL_DIR = 'thumbnails'
+CLIP_EXTENSIONS = ('.mp4', '.avi')
+
+
+def resolve_image(path):
+    """Where a saved detection image is now: the full frame, its thumbnail, or None once evicted"""
+    if path is None or os.path.exists(path):
+        return path
+    thumbnail = os.path.join(os.path.dirname(path), THUMBNAIL_DIR, os.path.basename(path))
+    return thumbnail if os.path.exists(thumbnail) else None
+
+
+class ImageRetention:
+    """Keeps the detection images and event clips within a byte budget and age limits.
+
+    Recent detections stay full resolution, older ones are replaced by a small thumbnail
+    in `thumbnails/`, and the oldest files are deleted first when the budget or the free
+    space on the disk runs short. Event clips in `clips_dir` count against the same budget
+    and are deleted oldest first alongside the thumbnails. The directories are scanned once
+    at start-up; after that the size index is kept up to date from the paths handed to
+    add(), so maintenance never has to list thousands of files.
+    """
+
+    def __init__(self, directory, max_bytes=2 << 30, full_resolution_age=7 * 86400, max_age=90 * 86400,
+                 min_free_bytes=256 << 20, thumbnail_width=320, thumbnail_quality=70, interval=10.0,
+                 clips_dir=None):
+        self.directory = directory
+        self.thumbnail_dir = os.path.join(directory, THUMBNAIL_DIR)
+        self.clips_dir = clips_dir
+        self.max_bytes = max_bytes
+        self.full_resolution_age = full_resolution_age  # Seconds before a frame becomes a thumbnail
+        self.max_age = max_age  # Seconds before any image is deleted
+        self.min_free_bytes = min_free_bytes  # Evict early when the disk itself gets this full
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_quality = thumbnail_quality
+        self.interval = interval
+
+        # Size index: oldest first, [modified time, path, bytes] per file
+        self.full = deque()
+        self.thumbnails = deque()
+        self.clips = deque()
+        self.full_bytes = 0
+        self.thumbnail_bytes = 0
+        self.clip_bytes = 0
+        self.added = deque()  # (time submitted, path) not yet on disk or not yet indexed
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.thumbnailed = 0
+        self.evicted = 0  # Deleted to stay within the byte budget or free space
+        self.expired = 0  # Deleted for being older than max_age
+        self.freed_bytes = 0
+
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+        if clips_dir:
+            os.makedirs(clips_dir, exist_ok=True)
+        self.scan()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.maintenance_loop, name='image-retention', daemon=True)
+        self.thread.start()
+
+    def scan(self):
+        """Build the size index from what is already on disk (start-up only)"""
+        directories = [(self.directory, self.full, IMAGE_EXTENSIONS),
+                       (self.thumbnail_dir, self.thumbnails, IMAGE_EXTENSIONS)]
+        if self.clips_dir:
+            directories.append((self.clips_dir, self.clips, CLIP_EXTENSIONS))
+        for directory, tier, extensions in directories:
+            entries = []
+            with os.scandir(directory) as listing:
+                for entry in listing:
+                    if entry.is_file() and entry.name.lower().endswith(extensions):
+                        stat = entry.stat()
+                        entries.append([stat.st_mtime, entry.path, stat.st_size])
+            tier.extend(sorted(entries))
+        self.full_bytes = sum(entry[2] for entry in self.full)
+        self.thumbnail_bytes = sum(entry[2] for entry in self.thumbnails)
+        self.clip_bytes = sum(entry[2] for entry in self.clips)
+
+    def add(self, path):
+        """Note a newly saved image or clip; it is indexed once the writer has put it on disk"""
+        if path is not None:
+            with self.lock:
+                self.added.append((time.time(), path))
+
+    def index_added(self, give_up_after=60.0):
+        now = time.time()
+        with self.lock:
+            waiting, self.added = self.added, deque()
+        for submitted, path in waiting:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Still queued in the writer, or dropped / failed and never coming
+                if now - submitted < give_up_after:
+                    with self.lock:
+                        self.added.append((submitted, path))
+                continue
+            with self.lock:
+                if self.clips_dir and os.path.normpath(os.path.dirname(path)) == os.path.normpath(self.clips_dir):
+                    self.clips.append([stat.st_mtime, path, stat.st_size])
+                    self.clip_bytes += stat.st_size
+                else:
+                    self.full.append([stat.st_mtime, path, stat.st_size])
+                    self.full_bytes += stat.st_size
+
+    def remove(self, tier, reason):
+        """Delete the oldest file of a tier"""
+        with self.lock:
+            modified, path, size = tier.popleft()
+            if tier is self.full:
+                self.full_bytes -= size
+            elif tier is self.clips:
+                self.clip_bytes -= size
+            else:
+                self.thumbnail_bytes -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self.freed_bytes += size
+        if reason == 'expired':
+            self.expired += 1
+        else:
+            self.evicted += 1
+
+    def make_thumbnail(self):
+        """Replace the oldest full frame with a thumbnail, or delete it if it can't be read"""
+        modified, path, size = self.full[0]
+        image = cv2.imread(path)
+        if image is None:
+            self.remove(self.full, 'evicted')
+            return
+        if image.shape[1] > self.thumbnail_width:
+            scale = self.thumbnail_width / image.shape[1]
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        thumbnail_path = os.path.join(self.thumbnail_dir, os.path.basename(path))
+        if not cv2.imwrite(thumbnail_path, image, [cv2.IMWRITE_JPEG_QUALITY, self.thumbnail_quality]):
+            self.remove(self.full, 'evicted')
+            return
+        os.utime(thumbnail_path, (modified, modified))
+        thumbnail_size = os.path.getsize(thumbnail_path)
+
+        with self.lock:
+            self.full.popleft()
+            self.full_bytes -= size
+            self.thumbnails.append([modified, thumbnail_path, thumbnail_size])
+            self.thumbnail_bytes += thumbnail_size
+        os.remove(path)
+        self.thumbnailed += 1
+        self.freed_bytes += size - thumbnail_size
+
+    def over_budget(self):
+        if self.full_bytes + self.thumbnail_bytes + self.clip_bytes > self.max_bytes:
+            return True
+        return shutil.disk_usage(self.directory).free < self.min_free_bytes
+
+    def oldest_deletable(self):
+        """The tier, thumbnails or clips, whose oldest file is older; None if both are empty"""
+        if not self.clips:
+            return self.thumbnails or None
+        if not self.thumbnails or self.clips[0][0] < self.thumbnails[0][0]:
+            return self.clips
+        return self.thumbnails
+
+    def maintain(self):
+        """One pass: index new files, apply the age limits, then evict oldest first"""
+        self.index_added()
+        now = time.time()
+        while self.thumbnails and now - self.thumbnails[0][0] > self.max_age:
+            self.remove(self.thumbnails, 'expired')
+        while self.clips and now - self.clips[0][0] > self.max_age:
+            self.remove(self.clips, 'expired')
+        while self.full and now - self.full[0][0] > self.max_age:
+            self.remove(self.full, 'expired')
+        while self.full and now - self.full[0][0] > self.full_resolution_age:
+            self.make_thumbnail()
+
+        # Thumbnails are always older than full frames, so they go first, with any clips older
+        # than the oldest full frame; then full frames are shrunk oldest first (deleting clips
+        # as their turn comes), and only then are the remaining thumbnails and clips deleted
+        while self.over_budget():
+            tier = self.oldest_deletable()
+            if tier is None or (self.full and tier[0][0] > self.full[0][0]):
+                break
+            self.remove(tier, 'evicted')
+        while self.full and self.over_budget():
+            if self.clips and self.clips[0][0] < self.full[0][0]:
+                self.remove(self.clips, 'evicted')
+            else:
+                self.make_thumbnail()
+        while self.over_budget():
+            tier = self.oldest_deletable()
+            if tier is None:
+                break
+            self.remove(tier, 'evicted')
+
+    def maintenance_loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.maintain()
+            except OSError as e:
+                print(f"Image retention error: {e}")
+
+    def close(self, timeout=5.0):
+        self.stop_event.set()
+        self.thread.join(timeout)
+
+    def summary(self):
+        return (f"{len(self.full)} full ({self.full_bytes / (1 << 20):.1f} MB), "
+                f"{len(self.thumbnails)} thumbnails ({self.thumbnail_bytes / (1 << 20):.1f} MB), "
+                f"{len(self.clips)} clips ({self.clip_bytes / (1 << 20):.1f} MB) "
+                f"of {self.max_bytes / (1 << 20):.0f} MB, {self.thumbnailed} shrunk, "
+                f"{self.evicted} evicted, {self.expired} expired")
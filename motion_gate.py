@@ -0,0 +1,68 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap frame differencing check that decides whether a frame is worth running YOLO on"""
+
+    def __init__(self, min_changed_fraction=0.005, force_interval=5.0, scale_width=160,
+                 pixel_threshold=25, learning_rate=0.05):
+        self.min_changed_fraction = min_changed_fraction  # Share of pixels that must change
+        self.force_interval = force_interval  # Run the detector at least this often (seconds)
+        self.scale_width = scale_width  # Width of the downscaled grayscale copy
+        self.pixel_threshold = pixel_threshold  # Grey level difference that counts as change
+        self.learning_rate = learning_rate  # How fast the background adapts to lighting changes
+
+        self.background = None
+        self.last_detect_time = 0
+        self.last_changed_fraction = 0.0
+
+        # Statistics
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.forced_checks = 0
+
+    def changed_fraction(self, frame):
+        """Return the fraction of the downscaled frame that differs from the background"""
+        height, width = frame.shape[:2]
+        scale_height = max(1, int(height * self.scale_width / width))
+        small = cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            return 1.0
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def should_detect(self, frame, now=None):
+        """Return True if the frame moved enough (or a periodic check is due)"""
+        if now is None:
+            now = time.monotonic()
+        self.frames_seen += 1
+        self.last_changed_fraction = self.changed_fraction(frame)
+
+        if self.last_changed_fraction >= self.min_changed_fraction:
+            self.last_detect_time = now
+            return True
+
+        # Still run the detector now and then so motionless intruders are not missed
+        if now - self.last_detect_time >= self.force_interval:
+            self.last_detect_time = now
+            self.forced_checks += 1
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def skip_ratio(self):
+        return self.frames_skipped / self.frames_seen if self.frames_seen else 0.0
+
+    def summary(self):
+        return (f"skipped {self.frames_skipped}/{self.frames_seen} frames "
+                f"({self.skip_ratio():.0%}), {self.forced_checks} forced checks")
@@ -0,0 +1,508 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from detection_writer import DetectionWriter
+from detections import boxes_to_detections
+from shared_frames import FrameRing
+from tiled_inference import merge_crops
+
+
+def next_batch(tasks, max_items):
+    """Wait for one task, then take whatever else is already queued, up to max_items"""
+    batch = [tasks.get()]
+    while len(batch) < max_items and batch[-1] is not None:
+        try:
+            batch.append(tasks.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def detection_worker(name, ring_spec, tasks, results, config):
+    """Worker process: batched YOLO on the crops of frames stored in the ring"""
+    from detector_backends import load_detector
+    if config.get('threads'):
+        try:
+            import torch
+            torch.set_num_threads(config['threads'])
+        except ImportError:
+            pass
+
+    ring = FrameRing.attach(ring_spec)
+    model = load_detector(config['model_path'])
+    model(np.zeros((480, 640, 3), dtype=np.uint8), classes=config['classes'], verbose=False)
+    results.put(('ready', name))
+
+    while True:
+        batch = next_batch(tasks, config['max_batch'])
+        stop = batch[-1] is None
+        batch = [task for task in batch if task is not None]
+        if batch:
+            images = []
+            for _, slot, shape, rects, _ in batch:
+                frame = ring.view(slot, shape)
+                images.extend(frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rects)
+
+            start = time.perf_counter()
+            found = model(images, classes=config['classes'], imgsz=batch[0][4], conf=config['conf'], verbose=False)
+            elapsed = time.perf_counter() - start
+            found = [boxes_to_detections(result.boxes, config['classes'], config['conf']) for result in found]
+
+            done = []
+            position = 0
+            for frame_id, _, _, rects, _ in batch:
+                offsets = [(x1, y1) for x1, y1, _, _ in rects]
+                done.append((frame_id, merge_crops(offsets, found[position:position + len(rects)],
+                                                   config['merge_threshold'])))
+                position += len(rects)
+            results.put(('detections', name, done, elapsed))
+        if stop:
+            break
+    ring.close()
+
+
+def face_worker(name, ring_spec, tasks, results, config):
+    """Worker process: find and encode faces inside person boxes of frames stored in the ring"""
+    from face_encoding import encode_faces
+    ring = FrameRing.attach(ring_spec)
+    face_recognition = None
+    results.put(('ready', name))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        if face_recognition is None:
+            # dlib is only loaded once somebody actually has to be recognized
+            import face_recognition
+        frame_id, slot, shape, boxes = task
+        start = time.perf_counter()
+        faces = encode_faces(face_recognition, ring.view(slot, shape), boxes, config['padding'],
+                             config['min_height'], config['max_upscale'])
+        results.put(('faces', name, frame_id, faces, time.perf_counter() - start))
+    ring.close()
+
+
+def writer_worker(name, ring_spec, tasks, results, config):
+    """Worker process: JPEG-encode frames stored in the ring and write them to disk"""
+    import cv2
+    ring = FrameRing.attach(ring_spec)
+    results.put(('ready', name))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, slot, shape, save_path = task
+        start = time.perf_counter()
+        try:
+            ok, encoded = cv2.imencode('.jpg', ring.view(slot, shape),
+                                       [cv2.IMWRITE_JPEG_QUALITY, config['jpeg_quality']])
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            with open(save_path, 'wb') as f:
+                f.write(encoded.tobytes())
+            print(f"Detection saved to {save_path}")
+        except Exception as e:
+            ok = False
+            print(f"Error saving detection {save_path}: {e}")
+        results.put(('written', name, job_id, ok, time.perf_counter() - start))
+    ring.close()
+
+
+class WorkerProcess:
+    """One supervised worker process with its own task queue"""
+
+    def __init__(self, context, name, target, results, config):
+        self.context = context
+        self.name = name
+        self.target = target
+        self.results = results
+        self.config = config
+        self.ring_spec = None
+        self.process = None
+        self.tasks = None
+        self.in_flight = {}  # Task id -> ring slot the task reads
+        self.lock = threading.Lock()
+        self.ready = False
+        self.started_at = 0.0
+        self.restarts = 0
+
+    def start(self, ring_spec):
+        with self.lock:
+            self.ring_spec = ring_spec
+            if self.tasks is None:
+                self.tasks = self.context.Queue()
+            self.ready = False
+            self.started_at = time.monotonic()
+            self.process = self.context.Process(
+                target=self.target, args=(self.name, ring_spec, self.tasks, self.results, self.config),
+                name=self.name, daemon=True)
+            self.process.start()
+
+    def abandon(self):
+        """Forget the tasks of a dead process and queue new ones for its successor; return the lost tasks"""
+        with self.lock:
+            lost = self.in_flight
+            self.in_flight = {}
+            self.tasks = self.context.Queue()
+            return lost
+
+    def submit(self, task_id, slot, task):
+        # Registering and queueing under one lock, so a restart never loses a task silently
+        with self.lock:
+            self.in_flight[task_id] = slot
+            self.tasks.put(task)
+
+    def finish(self, task_id):
+        """Mark a task done and return its slot, or None if it was already given up on"""
+        with self.lock:
+            return self.in_flight.pop(task_id, None)
+
+    def load(self):
+        with self.lock:
+            return len(self.in_flight)
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self, timeout=5.0):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.tasks.put(None)
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1.0)
+
+
+class Supervisor:
+    """Restarts worker processes that died, waiting longer each time one keeps crashing"""
+
+    def __init__(self, workers, on_lost, interval=1.0, max_delay=30.0):
+        self.workers = workers
+        self.on_lost = on_lost  # Called with (worker, {task id: slot}) for the tasks a crash lost
+        self.interval = interval
+        self.max_delay = max_delay
+        self.delays = {}
+
+    def run(self, stop_event):
+        while not stop_event.wait(self.interval):
+            for worker in self.workers:
+                if worker.is_alive() or stop_event.is_set():
+                    continue
+                lost = worker.abandon()
+                if lost:
+                    self.on_lost(worker, lost)
+
+                # A worker that keeps dying within a minute of starting gets a growing delay
+                crashed_early = time.monotonic() - worker.started_at < 60.0
+                delay = self.delays.get(worker.name, 1.0) if crashed_early else 1.0
+                self.delays[worker.name] = min(self.max_delay, delay * 2)
+                print(f"[supervisor] {worker.name} exited with code {worker.process.exitcode}, "
+                      f"restarting in {delay:.0f}s ({len(lost)} tasks lost)")
+                if stop_event.wait(delay):
+                    return
+                worker.restarts += 1
+                worker.start(worker.ring_spec)
+
+
+class ProcessDetectionWriter(DetectionWriter):
+    """Detection writer that hands frames in the ring to writer processes instead of threads"""
+
+    def __init__(self, pipeline, save_dir, max_pending=16, latency=None):
+        super().__init__(save_dir, max_pending=max_pending, num_threads=0, latency=latency)
+        self.pipeline = pipeline
+        self.max_pending = max_pending
+        self.jobs = itertools.count(1)
+
+    def pending_count(self):
+        return sum(worker.load() for worker in self.pipeline.writers)
+
+    def submit(self, frame, prefix):
+        """Queue a frame for writing and return its path, or None if it was dropped"""
+        ring = self.pipeline.ring
+        slot = ring.slot_of(frame)
+        if slot is not None:
+            ring.retain(slot)
+        elif self.pending_count() < self.max_pending:
+            # Frames that never went to the detector are copied into a slot of their own
+            slot, frame = ring.put(frame)
+
+        if slot is None or self.pending_count() >= self.max_pending:
+            if slot is not None:
+                ring.release(slot)
+            with self.stats_lock:
+                self.dropped += 1
+            return None
+
+        save_path = os.path.join(self.save_dir, self.make_filename(prefix))
+        job_id = next(self.jobs)
+        worker = min(self.pipeline.writers, key=WorkerProcess.load)
+        worker.submit(job_id, slot, (job_id, slot, frame.shape, save_path))
+        return save_path
+
+    def finished(self, worker, job_id, ok, elapsed):
+        slot = worker.finish(job_id)
+        if slot is None:
+            return
+        self.pipeline.ring.release(slot)
+        with self.stats_lock:
+            if ok:
+                self.written += 1
+            else:
+                self.failed += 1
+        if ok and self.latency is not None:
+            self.latency.record('save_write', elapsed)
+
+    def lost(self, tasks):
+        for slot in tasks.values():
+            self.pipeline.ring.release(slot)
+        with self.stats_lock:
+            self.failed += len(tasks)
+
+    def close(self, timeout=5.0):
+        """Wait for the writer processes to finish the queued frames"""
+        deadline = time.monotonic() + timeout
+        while self.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+
+class ProcessPipeline:
+    """Multi-process detection: frames that need YOLO go through a shared memory ring to worker processes.
+
+    Capture threads and the render/alert loop stay in the main process. A frame is
+    copied once into a ring slot; the detection, face and writer processes read it
+    there by slot index. Results are put back in per-camera order before they reach
+    the render loop, so the trackers see every camera's frames in sequence.
+    """
+
+    def __init__(self, system, detection_workers=2, max_batch=4, slots=None):
+        self.system = system
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+
+        slot_bytes = max(width * height * 3 for width, height in
+                         (camera.frame_size() for camera in system.cameras))
+        if slots is None:
+            # Frames waiting in every stage, plus the ones the writers still hold
+            slots = 4 * len(system.cameras) + 2 * detection_workers * max_batch + system.max_pending_writes
+        self.ring = FrameRing(slots, slot_bytes)
+
+        detection_config = {
+            'model_path': system.detector_path,  # Exported model of the chosen backend
+            'classes': system.target_class_ids,
+            'conf': system.confidence_threshold,
+            'merge_threshold': system.tile_merge_threshold,
+            'max_batch': max_batch,
+            'threads': max(1, (os.cpu_count() or 1) // detection_workers),  # Torch threads per worker
+        }
+        face_config = {
+            'padding': system.person_crop_padding,
+            'min_height': system.person_crop_min_height,
+            'max_upscale': system.person_crop_max_upscale,
+        }
+        writer_config = {'jpeg_quality': system.jpeg_quality}
+        self.detectors = [WorkerProcess(self.context, f'detect-{index}', detection_worker, self.results,
+                                        detection_config) for index in range(detection_workers)]
+        self.face_workers = [WorkerProcess(self.context, 'face-0', face_worker, self.results, face_config)]
+        self.writers = [WorkerProcess(self.context, 'writer-0', writer_worker, self.results, writer_config)]
+        self.workers = self.detectors + self.face_workers + self.writers
+        self.by_name = {worker.name: worker for worker in self.workers}
+        for worker in self.workers:
+            worker.start(self.ring.spec())
+
+        self.writer = ProcessDetectionWriter(self, system.save_dir, system.max_pending_writes, system.latency)
+
+        self.frame_ids = itertools.count(1)
+        self.frames = {}  # Frame id -> frame waiting for detection or face results
+        self.reorder = {}  # Camera name -> {sequence: finished result}
+        self.next_sequence = {}
+        self.lock = threading.Lock()
+        self.dispatch_done = False
+        self.lost_frames = 0
+
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def wait_ready(self, timeout=300.0):
+        """Wait until every detection worker loaded its model; False if they all died first"""
+        deadline = time.monotonic() + timeout
+        while not all(worker.ready for worker in self.detectors):
+            if not any(worker.is_alive() for worker in self.detectors) or time.monotonic() > deadline:
+                return False
+            try:
+                message = self.results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if message[0] == 'ready':
+                self.by_name[message[1]].ready = True
+        return True
+
+    def start(self):
+        supervisor = Supervisor(self.workers, self.lost)
+        self.threads = [
+            threading.Thread(target=self.collect_loop, name='process-results', daemon=True),
+            threading.Thread(target=supervisor.run, args=(self.stop_event,), name='supervisor', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def deliver(self, camera, sequence, item):
+        """Pass a finished frame on to the render loop, in capture order per camera"""
+        with self.lock:
+            waiting = self.reorder.setdefault(camera.name, {})
+            waiting[sequence] = item
+            next_sequence = self.next_sequence.get(camera.name, 1)
+            while next_sequence in waiting:
+                self.system.result_queue.put(waiting.pop(next_sequence))
+                next_sequence += 1
+            self.next_sequence[camera.name] = next_sequence
+
+    def complete(self, frame_id, detections):
+        with self.lock:
+            pending = self.frames.pop(frame_id, None)
+        if pending is not None:
+            camera = pending['camera']
+            self.deliver(camera, pending['sequence'], (camera, pending['captured_at'], pending['frame'], detections))
+
+    def release(self, frame):
+        """The render loop is done with a frame; free its slot once nobody else uses it"""
+        slot = self.ring.slot_of(frame)
+        if slot is not None:
+            self.ring.release(slot)
+
+    def detection_loop(self):
+        """Dispatch stage: copy frames that need YOLO into the ring and send them to the least busy detector"""
+        system = self.system
+        while not system.stop_event.is_set():
+            batch = system.collect_batch()
+            if batch is None:
+                break
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            if system.scheduler is not None:
+                system.scheduler.end_boost_if_due(start)
+
+            for camera, captured_at, frame in batch:
+                camera.frame_index += 1
+                sequence = camera.frame_index
+                crops = [] if camera.frame_index % system.frame_stride else system.frame_crops(camera, frame)
+                slot = None
+                if crops:
+                    # Replays wait for a free slot, live cameras drop the detection instead
+                    slot, view = self.ring.put(frame, block=system.lossless, timeout=0.5)
+                    while slot is None and system.lossless and not system.stop_event.is_set():
+                        slot, view = self.ring.put(frame, block=True, timeout=0.5)
+                if slot is None:
+                    # Static frame, or no free slot: show it without new detections
+                    self.deliver(camera, sequence, (camera, captured_at, frame, None))
+                    continue
+
+                rects = [(x, y, x + image.shape[1], y + image.shape[0]) for (x, y), image in crops]
+                frame_id = next(self.frame_ids)
+                with self.lock:
+                    self.frames[frame_id] = {'camera': camera, 'sequence': sequence,
+                                             'captured_at': captured_at, 'frame': view}
+                worker = min(self.detectors, key=WorkerProcess.load)
+                worker.submit(frame_id, slot, (frame_id, slot, frame.shape, rects, system.model_imgsz))
+            system.detection_stats.record(time.monotonic() - start)
+        self.dispatch_done = True
+
+    def collect_loop(self):
+        """Result stage: zones, identity cache and face matching, then hand frames to the render loop"""
+        while not self.stop_event.is_set():
+            try:
+                message = self.results.get(timeout=0.5)
+            except queue.Empty:
+                message = None
+
+            if message is not None:
+                kind, worker = message[0], self.by_name[message[1]]
+                if kind == 'ready':
+                    worker.ready = True
+                elif kind == 'detections':
+                    self.detected(worker, message[2], message[3])
+                elif kind == 'faces':
+                    self.faces_found(worker, message[2], message[3], message[4])
+                elif kind == 'written':
+                    self.writer.finished(worker, message[2], message[3], message[4])
+
+            # Sources ended and every frame was delivered
+            with self.lock:
+                finished = self.dispatch_done and not self.frames
+            if finished and not self.system.result_queue.closed:
+                self.system.result_queue.close()
+
+    def detected(self, worker, done, elapsed):
+        system = self.system
+        system.latency.record('yolo', elapsed)
+        if system.scheduler is not None:
+            # Detectors run side by side, so each one only has to keep up with its share
+            system.scheduler.record(elapsed / len(self.detectors))
+
+        for frame_id, detections in done:
+            slot = worker.finish(frame_id)
+            if slot is None:
+                continue
+            with self.lock:
+                pending = self.frames.get(frame_id)
+            camera = pending['camera']
+            if camera.zones is not None:
+                detections = camera.zones.assign(detections)
+
+            job = None
+            if system.face_recognition_enabled:
+                job = system.face_job(pending['frame'], detections, camera.name)
+            if job is None:
+                self.complete(frame_id, detections)
+                continue
+            pending['detections'] = detections
+            pending['job'] = job
+            boxes = [box for _, box, _ in job[2]]
+            self.face_workers[0].submit(frame_id, slot, (frame_id, slot, pending['frame'].shape, boxes))
+
+    def faces_found(self, worker, frame_id, faces, elapsed):
+        if worker.finish(frame_id) is None:
+            return
+        self.system.latency.record('face', elapsed)
+        with self.lock:
+            pending = self.frames.get(frame_id)
+        self.system.apply_faces(pending['frame'], pending['detections'], pending['job'], faces)
+        self.complete(frame_id, pending['detections'])
+
+    def lost(self, worker, tasks):
+        """A worker died: pass its frames on without the results it owed"""
+        if worker in self.writers:
+            self.writer.lost(tasks)
+            return
+        self.lost_frames += len(tasks)
+        for frame_id in tasks:
+            with self.lock:
+                pending = self.frames.get(frame_id)
+            if pending is not None:
+                self.complete(frame_id, pending.get('detections'))
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        for worker in self.workers:
+            worker.stop()
+        self.results.close()
+        self.ring.close()
+
+    def summary(self):
+        alive = sum(worker.is_alive() for worker in self.workers)
+        restarts = sum(worker.restarts for worker in self.workers)
+        return (f"{alive}/{len(self.workers)} workers alive, {restarts} restarts, "
+                f"{self.lost_frames} frames lost, ring {self.ring.summary()}")
@@ -0,0 +1,147 @@
+import json
+
+import cv2
+import numpy as np
+
+
+class Zone:
+    """Polygon area of one camera with the classes that raise alerts inside it"""
+
+    def __init__(self, name, polygon, class_ids, enabled=True):
+        self.name = name
+        self.points = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+        self.class_ids = sorted(set(class_ids))
+        self.enabled = enabled
+
+    @property
+    def active(self):
+        return self.enabled and bool(self.class_ids)
+
+    def polygon(self, width, height):
+        """Polygon in pixels; coordinates no larger than 1.0 are fractions of the frame size"""
+        points = self.points
+        if points.max() <= 1.0:
+            points = points * (width, height)
+        return np.round(points).astype(np.int32)
+
+
+def load_zones(path, target_classes):
+    """Read zones from a JSON file shaped like
+
+        {"cam0": [{"name": "pond edge", "polygon": [[x, y], ...], "classes": ["bird", "dog"]}]}
+
+    A zone without "classes" alerts on every target class; "enabled": false keeps it configured but unused.
+    A camera whose zones are all disabled (or have no classes) is left out, so it watches the whole frame.
+    """
+    ids_by_name = {info['name']: cls_id for cls_id, info in target_classes.items()}
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    zones = {}
+    for camera_name, entries in config.items():
+        for index, entry in enumerate(entries):
+            name = entry.get('name', f"zone{index}")
+            if len(entry.get('polygon', [])) < 3:
+                raise ValueError(f"Zone '{name}' of {camera_name} needs a polygon with at least 3 points")
+            class_names = entry.get('classes', list(ids_by_name))
+            unknown = [class_name for class_name in class_names if class_name not in ids_by_name]
+            if unknown:
+                raise ValueError(f"Zone '{name}' of {camera_name} has unknown classes: {', '.join(unknown)}")
+            zones.setdefault(camera_name, []).append(
+                Zone(name, entry['polygon'], [ids_by_name[class_name] for class_name in class_names],
+                     entry.get('enabled', True)))
+
+    for camera_name in [name for name, camera_zones in zones.items()
+                        if not any(zone.active for zone in camera_zones)]:
+        print(f"All zones of {camera_name} are disabled, it watches the whole frame")
+        del zones[camera_name]
+    return zones
+
+
+def merge_rects(rects):
+    """Union overlapping (x1, y1, x2, y2) rectangles until none of them overlap"""
+    rects = [tuple(rect) for rect in rects]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+class CameraZones:
+    """Active zones of one camera, laid out for its frame size"""
+
+    def __init__(self, zones, padding=16):
+        self.zones = [zone for zone in zones if zone.active]
+        self.padding = padding  # Pixels of context kept around each zone crop
+
+        self.shape = None
+        self.polygons = []
+        self.crops = []
+
+        # Statistics
+        self.inside = 0
+        self.outside = 0
+
+    def layout(self, frame):
+        """Return the merged bounding crops of the zones for this frame size"""
+        height, width = frame.shape[:2]
+        if self.shape != (height, width):
+            self.shape = (height, width)
+            self.polygons = [zone.polygon(width, height) for zone in self.zones]
+            rects = []
+            for polygon in self.polygons:
+                x, y, w, h = cv2.boundingRect(polygon)
+                rects.append((max(0, x - self.padding), max(0, y - self.padding),
+                              min(width, x + w + self.padding), min(height, y + h + self.padding)))
+            self.crops = merge_rects(rects)
+        return self.crops
+
+    def crop_fraction(self):
+        """Share of the frame that still goes to the detector"""
+        if not self.shape:
+            return 1.0
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in self.crops)
+        return min(1.0, area / (self.shape[0] * self.shape[1]))
+
+    def assign(self, detections):
+        """Keep the detections standing in a zone that alerts on their class and record that zone.
+
+        An object's position is the bottom centre of its box, where it touches the ground,
+        so a person on the road behind the fence is not counted inside a zone drawn on the field.
+        """
+        keep = np.zeros(len(detections), dtype=bool)
+        for row, (cls_id, x1, x2, y2) in enumerate(zip(detections['cls'].tolist(), detections['x1'].tolist(),
+                                                       detections['x2'].tolist(), detections['y2'].tolist())):
+            point = ((x1 + x2) / 2.0, float(y2))
+            for index, (zone, polygon) in enumerate(zip(self.zones, self.polygons)):
+                if cls_id in zone.class_ids and cv2.pointPolygonTest(polygon, point, False) >= 0:
+                    detections['zone'][row] = index
+                    keep[row] = True
+                    break
+        kept = int(np.count_nonzero(keep))
+        self.inside += kept
+        self.outside += len(detections) - kept
+        return detections[keep]
+
+    def zone_name(self, index):
+        return self.zones[index].name if 0 <= index < len(self.zones) else None
+
+    def draw(self, frame):
+        for zone, polygon in zip(self.zones, self.polygons):
+            cv2.polylines(frame, [polygon], True, (255, 255, 0), 1)
+            x, y = polygon[0]
+            cv2.putText(frame, zone.name, (int(x) + 4, int(y) + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+
+    def summary(self):
+        return (f"{len(self.zones)} zones on {self.crop_fraction():.0%} of the frame, "
+                f"{self.inside} detections inside, {self.outside} outside")
@@ -0,0 +1,106 @@
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class FrameRing:
+    """Fixed number of frame slots in one shared memory block, used by worker processes by slot index.
+
+    The process that creates the ring owns it: it hands out free slots, counts the
+    users of each slot and puts a slot back once every user released it. Worker
+    processes attach by name and only read the slot they were told about.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.block = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            # Spawned workers share the owner's resource tracker, so attaching registers nothing new
+            self.block = shared_memory.SharedMemory(name=name)
+        self.buffer = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=self.block.buf)
+        self.base_address = self.buffer.ctypes.data
+
+        # Owner bookkeeping
+        self.condition = threading.Condition()
+        self.free = deque(range(slots))
+        self.refs = [0] * slots
+        self.dropped = 0
+
+    @property
+    def name(self):
+        return self.block.name
+
+    def spec(self):
+        """What a worker process needs to attach: (name, slots, slot_bytes)"""
+        return self.block.name, self.slots, self.slot_bytes
+
+    @classmethod
+    def attach(cls, spec):
+        name, slots, slot_bytes = spec
+        return cls(slots, slot_bytes, name)
+
+    def view(self, slot, shape, dtype=np.uint8):
+        """The frame stored in a slot, without copying"""
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return self.buffer[slot, :size].view(dtype).reshape(shape)
+
+    def put(self, frame, block=False, timeout=None):
+        """Copy a frame into a free slot and return (slot, view), or (None, None) if none is free.
+
+        Frames that are too big for a slot, or don't get a slot without blocking, count as dropped.
+        """
+        with self.condition:
+            if frame.nbytes > self.slot_bytes:
+                self.dropped += 1
+                return None, None
+            if block:
+                self.condition.wait_for(lambda: self.free, timeout)
+            if not self.free:
+                if not block:
+                    self.dropped += 1
+                return None, None
+            slot = self.free.popleft()
+            self.refs[slot] = 1
+        view = self.view(slot, frame.shape, frame.dtype)
+        view[...] = frame
+        return slot, view
+
+    def slot_of(self, array):
+        """Slot index an array lives in, or None if it is not in the ring"""
+        offset = array.__array_interface__['data'][0] - self.base_address
+        if 0 <= offset < self.slots * self.slot_bytes:
+            return offset // self.slot_bytes
+        return None
+
+    def retain(self, slot):
+        with self.condition:
+            self.refs[slot] += 1
+
+    def release(self, slot):
+        with self.condition:
+            self.refs[slot] -= 1
+            if self.refs[slot] == 0:
+                self.free.append(slot)
+                self.condition.notify_all()
+
+    def in_use(self):
+        with self.condition:
+            return self.slots - len(self.free)
+
+    def close(self):
+        self.buffer = None
+        try:
+            self.block.close()
+        except BufferError:
+            # Frames still referenced elsewhere keep the mapping alive until they are collected
+            pass
+        if self.owner:
+            self.block.unlink()
+
+    def summary(self):
+        return f"{self.in_use()}/{self.slots} slots in use, {self.dropped} frames dropped"
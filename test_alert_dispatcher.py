@@ -0,0 +1,51 @@
+import time
+
+from alert_dispatcher import Alert, AlertDispatcher
+
+
+class RecordingSink:
+    name = 'recording'
+
+    def __init__(self):
+        self.alerts = []
+
+    def send(self, alert):
+        self.alerts.append(alert)
+
+
+def test_cooldown_is_kept_per_type_camera_and_zone(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    sink = RecordingSink()
+    dispatcher = AlertDispatcher([sink], cooldowns={'bird': 30.0}, default_cooldown=5.0)
+    try:
+        assert dispatcher.submit(Alert('bird', 'bird', 'cam0', zone=0))
+        assert not dispatcher.submit(Alert('bird', 'bird', 'cam0', zone=0))
+
+        # Another zone, another camera or another type is not held back by that bird
+        assert dispatcher.submit(Alert('bird', 'bird', 'cam0', zone=1))
+        assert dispatcher.submit(Alert('bird', 'bird', 'cam1', zone=0))
+        assert dispatcher.submit(Alert('human', 'person', 'cam0', zone=0))
+
+        # Each type cools down for its own time
+        clock[0] += 10.0
+        assert dispatcher.submit(Alert('human', 'person', 'cam0', zone=0))
+        assert not dispatcher.submit(Alert('bird', 'bird', 'cam0', zone=0))
+        clock[0] += 25.0
+        assert dispatcher.submit(Alert('bird', 'bird', 'cam0', zone=0))
+    finally:
+        dispatcher.close()
+
+    assert dispatcher.sent == 6 and dispatcher.suppressed == 2
+    assert len(sink.alerts) == 6
+
+
+def test_suppressed_alert_does_not_restart_the_cooldown(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    dispatcher = AlertDispatcher([], default_cooldown=5.0)
+    assert dispatcher.submit(Alert('animal', 'dog', 'cam0'))
+    clock[0] = 4.0
+    assert not dispatcher.submit(Alert('animal', 'dog', 'cam0'))
+    clock[0] = 5.0
+    assert dispatcher.submit(Alert('animal', 'dog', 'cam0'))
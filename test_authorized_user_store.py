@@ -0,0 +1,49 @@
+import multiprocessing
+
+import numpy as np
+
+from authorized_user_store import AuthorizedUserStore
+
+
+def enroll(directory, prefix, count):
+    store = AuthorizedUserStore(directory, initial_capacity=4)
+    for i in range(count):
+        store.add(f'{prefix}{i}', np.full(128, i, dtype=np.float32))
+
+
+def test_two_processes_appending_keep_every_row(tmp_path):
+    workers = [multiprocessing.Process(target=enroll, args=(str(tmp_path), prefix, 20)) for prefix in 'ab']
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    store = AuthorizedUserStore(str(tmp_path))
+    assert sorted(store.names()) == sorted(f'{prefix}{i}' for prefix in 'ab' for i in range(20))
+    for (row, meta), encoding in zip(store.metadata(), store.encodings()):
+        assert encoding[0] == int(meta['name'][1:])
+
+
+def test_store_sees_rows_added_and_compacted_by_another_instance(tmp_path):
+    first = AuthorizedUserStore(str(tmp_path), initial_capacity=2)
+    second = AuthorizedUserStore(str(tmp_path), initial_capacity=2)
+    first.add('alice', np.ones(128))
+    second.add('bob', np.full(128, 2.0))
+    first.add('carol', np.full(128, 3.0))  # Grows the matrix under second's mapping
+
+    assert second.delete('alice') == 1  # Compacts: the rows of bob and carol move
+    first.add('dave', np.full(128, 4.0))
+    assert first.names() == ['bob', 'carol', 'dave']
+    assert first.encodings()[:, 0].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_torn_index_line_is_dropped(tmp_path):
+    store = AuthorizedUserStore(str(tmp_path))
+    store.add('alice', np.ones(128))
+    with open(store.index_path, 'ab') as f:
+        f.write(b'{"op": "add", "ro')
+
+    reopened = AuthorizedUserStore(str(tmp_path))
+    reopened.add('bob', np.full(128, 2.0))
+    assert AuthorizedUserStore(str(tmp_path)).names() == ['alice', 'bob']
@@ -0,0 +1,12 @@
+from clip_recorder import Clip, ClipRecorder
+
+
+def test_clips_started_in_the_same_second_get_their_own_files(tmp_path):
+    recorder = ClipRecorder(str(tmp_path))
+    try:
+        first = Clip('cam0', 'person', 0.0, 10.0)
+        second = Clip('cam0', 'person', 0.5, 10.5)
+        second.created = first.created
+        assert recorder.clip_path(first) != recorder.clip_path(second)
+    finally:
+        recorder.close()
@@ -0,0 +1,59 @@
+import numpy as np
+
+from face_index import ENCODING_SIZE, FaceIndex
+
+
+def make_users(count, seed=0):
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(0.0, 0.1, (count, ENCODING_SIZE)).astype(np.float32)
+    return encodings, [f'user{i}' for i in range(count)]
+
+
+def test_flann_agrees_with_exact_search():
+    encodings, names = make_users(400)
+    exact = FaceIndex(ann_threshold=10 ** 6)
+    flann = FaceIndex(ann_threshold=1)
+    exact.set(encodings, names)
+    flann.set(encodings, names)
+
+    rng = np.random.default_rng(1)
+    queries = encodings[::7] + rng.normal(0.0, 0.01, (len(encodings[::7]), ENCODING_SIZE)).astype(np.float32)
+    exact_indices, exact_distances = exact.nearest(queries)
+    flann_indices, flann_distances = flann.nearest(queries)
+
+    assert list(exact_indices) == list(range(0, len(encodings), 7))
+    assert list(flann_indices) == list(exact_indices)
+    np.testing.assert_allclose(flann_distances, exact_distances, rtol=1e-3, atol=1e-4)
+    assert flann.ann_index is not None and exact.ann_index is None
+
+
+def test_match_applies_the_tolerance():
+    encodings, names = make_users(3)
+    index = FaceIndex()
+    index.set(encodings, names)
+    far = encodings[2] + 1.0
+    matches = index.match(np.stack([encodings[1], far]), tolerance=0.6)
+    assert matches[0][0] == 'user1' and matches[0][1] < 1e-3
+    assert matches[1][0] is None
+
+
+def test_add_grows_the_matrix_and_rebuilds_the_ann_index():
+    encodings, names = make_users(40)
+    index = FaceIndex(ann_threshold=20)
+    for name, encoding in zip(names[:20], encodings[:20]):
+        index.add(name, encoding)
+    assert index.match(encodings[5])[0][0] == 'user5'
+    assert index.ann_index is not None
+
+    for name, encoding in zip(names[20:], encodings[20:]):
+        index.add(name, encoding)
+    assert len(index) == 40 and len(index.matrix) >= 40
+    assert index.ann_index is None
+    assert index.match(encodings[33])[0][0] == 'user33'
+
+
+def test_empty_index_matches_nobody():
+    index = FaceIndex()
+    indices, distances = index.nearest(np.zeros((2, ENCODING_SIZE)))
+    assert list(indices) == [-1, -1] and np.isinf(distances).all()
+    assert index.match(np.zeros(ENCODING_SIZE)) == [(None, float('inf'))]
@@ -0,0 +1,28 @@
+from frame_scheduler import AdaptiveScheduler
+
+
+def test_level_keeps_adapting_while_boosted():
+    applied = []
+    scheduler = AdaptiveScheduler(target_fps=10, min_dwell=1.0, on_change=applied.append)
+    scheduler.last_change = 0.0
+    scheduler.boost(now=0.0)
+
+    # Every run is over budget even at full effort: the level rises, but only takes effect later
+    for now in (1.5, 3.0, 4.5):
+        scheduler.record(0.5, now=now)
+    assert scheduler.level > 0
+    assert scheduler.active_level(now=4.5) == 0
+    assert applied == []
+
+    scheduler.end_boost_if_due(now=6.0)
+    assert scheduler.active_level(now=6.0) == scheduler.level
+    assert applied == [scheduler.levels[scheduler.level]]
+
+
+def test_boost_ends_after_its_duration():
+    scheduler = AdaptiveScheduler(target_fps=10, boost_duration=5.0)
+    scheduler.level = 2
+    scheduler.boost(now=0.0)
+    assert scheduler.active_level(now=4.0) == 0
+    scheduler.end_boost_if_due(now=5.0)
+    assert scheduler.active_level(now=5.0) == 2
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from enhanced_farm_security_system import EnhancedFarmSecuritySystem
+from identity_cache import IdentityCache
+from tracker import Track
+
+
+def test_cached_person_authorizes_only_one_of_two_overlapping_boxes():
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    cache = IdentityCache()
+    worker = (100, 100, 200, 400)
+    intruder = (140, 100, 240, 400)
+    cache.store('alice', worker, cache.thumbnail(frame, worker), now=0.0)
+
+    boxes = [intruder, worker]
+    names = cache.lookup(boxes, [cache.thumbnail(frame, box) for box in boxes], now=1.0)
+
+    assert names == [None, 'alice']
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_cached_person_follows_their_own_box():
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    cache = IdentityCache()
+    cache.store('alice', (100, 100, 200, 400), cache.thumbnail(frame, (100, 100, 200, 400)), now=0.0)
+
+    moved = (110, 100, 210, 400)
+    assert cache.lookup([moved], [cache.thumbnail(frame, moved)], now=1.0) == ['alice']
+    assert cache.entries[0].box == moved
+
+
+def test_cache_miss_keeps_track_authorized_until_recheck_fails():
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    cache = IdentityCache()
+    box = (100, 100, 200, 400)
+    cache.store('alice', box, cache.thumbnail(frame, box), now=0.0)
+    track = Track(1, 0, box, now=0.0)
+    track.check_face(authorized=True, rejected=False)
+
+    # The head turns: the thumbnail no longer matches, so the face must be checked again
+    frame[100:200, 100:200] = 0
+    assert cache.lookup([box], [cache.thumbnail(frame, box)], now=1.0) == [None]
+    track.check_face(authorized=False, rejected=False)
+    assert track.authorized
+
+    # The re-check finds a face that matches no one
+    track.check_face(authorized=False, rejected=True)
+    assert not track.authorized and track.rejected
+
+
+def test_successful_recheck_is_cached_again():
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    cache = IdentityCache()
+    box = (100, 100, 200, 400)
+    cache.store('alice', box, cache.thumbnail(frame, box), now=0.0)
+
+    frame[100:200, 100:200] = 0
+    thumbnail = cache.thumbnail(frame, box)
+    assert cache.lookup([box], [thumbnail], now=1.0) == [None]
+    cache.store('alice', box, thumbnail, now=1.5)
+    assert cache.lookup([box], [cache.thumbnail(frame, box)], now=2.0) == ['alice']
+    assert len(cache.entries) == 1
+
+
+def test_verified_entry_expires_after_ttl():
+    frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+    cache = IdentityCache(ttl=30.0, leave_after=10.0)
+    box = (100, 100, 200, 400)
+    cache.store('alice', box, cache.thumbnail(frame, box), now=0.0)
+    for now in range(5, 30, 5):
+        assert cache.lookup([box], [cache.thumbnail(frame, box)], now=float(now)) == ['alice']
+    cache.expire(31.0)
+    assert cache.lookup([box], [cache.thumbnail(frame, box)], now=31.0) == [None]
+    assert cache.expired == 1
+
+
+def test_human_alert_waits_for_the_first_face_check():
+    system = SimpleNamespace(face_recognition_enabled=True, face_index=[object()], face_grace_checks=2,
+                             face_recognition_cooldown=1.0)
+    track = Track(1, 0, (100, 100, 200, 400), now=0.0)
+    assert EnhancedFarmSecuritySystem.face_check_pending(system, track, now=0.5)
+    assert not EnhancedFarmSecuritySystem.face_check_pending(system, track, now=2.5)
+
+    # A failed check alerts at once, and with no users enrolled there is nothing to wait for
+    track.check_face(authorized=False, rejected=True)
+    assert not EnhancedFarmSecuritySystem.face_check_pending(system, track, now=0.5)
+    system.face_index = []
+    assert not EnhancedFarmSecuritySystem.face_check_pending(system, Track(2, 0, (0, 0, 1, 1), 0.0), now=0.5)
@@ -0,0 +1,101 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from image_retention import THUMBNAIL_DIR, ImageRetention, resolve_image
+
+
+def save_image(directory, name, age, now):
+    """A noisy 640x480 JPEG (tens of KB) last modified `age` seconds ago"""
+    path = os.path.join(directory, name)
+    cv2.imwrite(path, np.random.default_rng(len(name)).integers(0, 255, (480, 640, 3), dtype=np.uint8))
+    os.utime(path, (now - age, now - age))
+    return path
+
+
+def make_retention(directory, **options):
+    # A long interval keeps the background pass out of the way; the tests call maintain() themselves
+    return ImageRetention(str(directory), min_free_bytes=0, interval=1000, **options)
+
+
+def test_old_frames_become_thumbnails_and_expired_ones_go(tmp_path):
+    now = time.time()
+    recent = save_image(tmp_path, 'recent.jpg', 60, now)
+    old = save_image(tmp_path, 'old.jpg', 8 * 86400, now)
+    ancient = save_image(tmp_path, 'ancient.jpg', 100 * 86400, now)
+    retention = make_retention(tmp_path)
+    try:
+        retention.maintain()
+    finally:
+        retention.close()
+
+    assert resolve_image(recent) == recent
+    assert resolve_image(old) == os.path.join(tmp_path, THUMBNAIL_DIR, 'old.jpg')
+    assert resolve_image(ancient) is None
+    assert retention.thumbnailed == 1 and retention.expired == 1 and retention.evicted == 0
+    assert os.path.getsize(resolve_image(old)) < os.path.getsize(recent)
+
+
+def test_budget_shrinks_oldest_frames_before_deleting_anything(tmp_path):
+    now = time.time()
+    paths = [save_image(tmp_path, f'frame{i}.jpg', 3600 * (5 - i), now) for i in range(5)]
+    frame_bytes = sum(os.path.getsize(path) for path in paths)
+    retention = make_retention(tmp_path, max_bytes=frame_bytes - 1)
+    try:
+        retention.maintain()
+        # Shrinking the oldest frame alone brings the total under the budget
+        assert retention.thumbnailed == 1 and retention.evicted == 0
+        assert resolve_image(paths[0]).endswith(os.path.join(THUMBNAIL_DIR, 'frame0.jpg'))
+        assert all(resolve_image(path) == path for path in paths[1:])
+        assert retention.full_bytes + retention.thumbnail_bytes <= retention.max_bytes
+
+        # A tighter budget shrinks every frame, then deletes the oldest thumbnails
+        retention.max_bytes = os.path.getsize(resolve_image(paths[0])) * 3
+        retention.maintain()
+    finally:
+        retention.close()
+
+    assert retention.thumbnailed == 5 and retention.evicted == 2
+    assert [resolve_image(path) is None for path in paths] == [True, True, False, False, False]
+    assert retention.full_bytes == 0
+    assert retention.thumbnail_bytes == sum(os.path.getsize(resolve_image(path)) for path in paths[2:])
+
+
+def test_clips_count_against_the_budget_and_go_oldest_first(tmp_path):
+    now = time.time()
+    clips_dir = tmp_path / 'clips'
+    clips_dir.mkdir()
+    clip = clips_dir / 'old.mp4'
+    clip.write_bytes(b'\0' * 200_000)
+    os.utime(clip, (now - 7200, now - 7200))
+    frame = save_image(tmp_path, 'frame.jpg', 60, now)
+    retention = make_retention(tmp_path, clips_dir=str(clips_dir), max_bytes=os.path.getsize(frame) + 1000)
+    try:
+        assert retention.clip_bytes == 200_000
+        retention.maintain()
+    finally:
+        retention.close()
+
+    assert not clip.exists()
+    assert resolve_image(frame) == frame
+    assert retention.evicted == 1 and retention.clip_bytes == 0
+
+
+def test_new_images_are_indexed_once_written(tmp_path):
+    now = time.time()
+    retention = make_retention(tmp_path)
+    try:
+        pending = os.path.join(tmp_path, 'pending.jpg')
+        retention.add(pending)
+        retention.maintain()
+        assert len(retention.full) == 0 and len(retention.added) == 1
+
+        save_image(tmp_path, 'pending.jpg', 0, now)
+        retention.maintain()
+    finally:
+        retention.close()
+
+    assert [entry[1] for entry in retention.full] == [pending]
+    assert retention.full_bytes == os.path.getsize(pending) and not retention.added
@@ -0,0 +1,62 @@
+import numpy as np
+
+from shared_frames import FrameRing
+
+
+def test_slot_is_reused_once_every_user_released_it():
+    ring = FrameRing(2, 64 * 48 * 3)
+    try:
+        frame = np.full((48, 64, 3), 7, dtype=np.uint8)
+        first, view = ring.put(frame)
+        second, _ = ring.put(frame)
+        assert {first, second} == {0, 1}
+        assert ring.slot_of(view) == first and ring.slot_of(frame) is None
+        assert (view == 7).all()
+
+        # Full: the next frame is dropped instead of waiting
+        assert ring.put(frame) == (None, None)
+        assert ring.dropped == 1
+
+        # A second user keeps the slot busy until both are done with it
+        ring.retain(first)
+        ring.release(first)
+        assert ring.in_use() == 2
+        ring.release(first)
+        assert ring.in_use() == 1
+
+        slot, view = ring.put(np.full((48, 64, 3), 9, dtype=np.uint8))
+        assert slot == first and (view == 9).all()
+    finally:
+        ring.close()
+
+
+def test_attached_ring_reads_the_owners_frames():
+    ring = FrameRing(1, 16)
+    try:
+        slot, _ = ring.put(np.arange(16, dtype=np.uint8).reshape(4, 4))
+        worker = FrameRing.attach(ring.spec())
+        try:
+            assert (worker.view(slot, (4, 4)) == np.arange(16).reshape(4, 4)).all()
+        finally:
+            worker.close()
+    finally:
+        ring.close()
+
+
+def test_frame_too_big_for_a_slot_is_dropped():
+    ring = FrameRing(1, 16)
+    try:
+        assert ring.put(np.zeros(17, dtype=np.uint8)) == (None, None)
+        assert ring.dropped == 1 and ring.in_use() == 0
+    finally:
+        ring.close()
+
+
+def test_blocking_put_times_out_without_counting_a_drop():
+    ring = FrameRing(1, 16)
+    try:
+        ring.put(np.zeros(16, dtype=np.uint8))
+        assert ring.put(np.zeros(16, dtype=np.uint8), block=True, timeout=0.05) == (None, None)
+        assert ring.dropped == 0
+    finally:
+        ring.close()
@@ -0,0 +1,45 @@
+import numpy as np
+
+from detections import DETECTION_DTYPE, detection_boxes
+from tiled_inference import merge_crops, tile_grid
+
+
+def make_detections(*rows):
+    """(cls, conf, x1, y1, x2, y2) per detection"""
+    return np.array([(cls, conf, x1, y1, x2, y2, False, False, -1) for cls, conf, x1, y1, x2, y2 in rows],
+                    dtype=DETECTION_DTYPE)
+
+
+def test_object_cut_by_a_tile_edge_is_kept_once():
+    # A bird at x 600..660 in the overlap of the left tile and the right tile (starting at x 512)
+    offsets = [(0, 0), (512, 0)]
+    left = make_detections((14, 0.8, 600, 100, 658, 140))
+    right = make_detections((14, 0.9, 88, 100, 148, 140))
+    merged = merge_crops(offsets, [left, right])
+    assert len(merged) == 1
+    assert merged['conf'][0] == np.float32(0.9)
+    assert list(detection_boxes(merged)[0]) == [600, 100, 660, 140]
+
+
+def test_partial_box_from_another_tile_is_dropped():
+    offsets = [(0, 0), (512, 0)]
+    whole = make_detections((14, 0.9, 560, 100, 640, 140))
+    partial = make_detections((14, 0.6, 0, 100, 128, 140))
+    merged = merge_crops(offsets, [whole, partial])
+    assert len(merged) == 1 and merged['conf'][0] == np.float32(0.9)
+
+
+def test_overlapping_boxes_in_one_tile_and_other_classes_survive():
+    offsets = [(0, 0), (512, 0)]
+    flock = make_detections((14, 0.9, 100, 100, 140, 140), (14, 0.8, 110, 100, 150, 140))
+    other_class = make_detections((16, 0.7, 88, 100, 148, 140))
+    cut = make_detections((14, 0.9, 600, 100, 660, 140))
+    merged = merge_crops(offsets, [np.concatenate([flock, cut]), other_class])
+    assert len(merged) == 4
+
+
+def test_tiles_cover_the_frame_with_overlap():
+    tiles = tile_grid(1920, 1080, tile_size=640, overlap=0.2)
+    assert tiles[0][:2] == (0, 0) and tiles[-1][2:] == (1920, 1080)
+    xs = sorted({tile[0] for tile in tiles})
+    assert all(b - a <= 640 * 0.8 for a, b in zip(xs, xs[1:]))
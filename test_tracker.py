@@ -0,0 +1,58 @@
+import numpy as np
+
+from detections import DETECTION_DTYPE
+from tracker import IoUTracker
+
+
+def make_detections(*rows):
+    """(cls, x1, y1, x2, y2) per detection"""
+    return np.array([(cls, 0.9, x1, y1, x2, y2, False, False, -1) for cls, x1, y1, x2, y2 in rows],
+                    dtype=DETECTION_DTYPE)
+
+
+def test_moving_objects_keep_their_track_ids():
+    tracker = IoUTracker()
+    ids, entered, left = tracker.update(make_detections((0, 100, 100, 200, 300), (14, 400, 50, 450, 100)), now=0.0)
+    assert list(ids) == [1, 2]
+    assert [track.track_id for track in entered] == [1, 2] and left == []
+
+    # Both moved a little and come back in the other order
+    ids, entered, left = tracker.update(make_detections((14, 405, 55, 455, 105), (0, 110, 100, 210, 300)), now=1.0)
+    assert list(ids) == [2, 1]
+    assert entered == [] and left == []
+    assert list(tracker.get(1).box) == [110, 100, 210, 300]
+    assert tracker.get(1).last_seen == 1.0
+
+
+def test_other_class_in_the_same_place_starts_a_new_track():
+    tracker = IoUTracker()
+    tracker.update(make_detections((0, 100, 100, 200, 300)), now=0.0)
+    ids, entered, left = tracker.update(make_detections((16, 100, 100, 200, 300)), now=1.0)
+    assert list(ids) == [2]
+    assert [track.cls_id for track in entered] == [16]
+
+
+def test_track_leaves_after_max_missed_runs():
+    tracker = IoUTracker(max_missed=2)
+    tracker.update(make_detections((0, 100, 100, 200, 300)), now=0.0)
+    for now in (1.0, 2.0):
+        ids, entered, left = tracker.update(make_detections(), now=now)
+        assert left == [] and tracker.get(1) is not None
+
+    ids, entered, left = tracker.update(make_detections(), now=3.0)
+    assert [track.track_id for track in left] == [1]
+    assert tracker.get(1) is None
+
+    # Coming back after leaving is a new object
+    ids, entered, left = tracker.update(make_detections((0, 100, 100, 200, 300)), now=4.0)
+    assert list(ids) == [2]
+
+
+def test_missed_count_resets_when_seen_again():
+    tracker = IoUTracker(max_missed=1)
+    tracker.update(make_detections((0, 100, 100, 200, 300)), now=0.0)
+    tracker.update(make_detections(), now=1.0)
+    ids, entered, left = tracker.update(make_detections((0, 100, 100, 200, 300)), now=2.0)
+    assert list(ids) == [1] and tracker.get(1).missed == 0
+    ids, entered, left = tracker.update(make_detections(), now=3.0)
+    assert left == []
@@ -0,0 +1,164 @@
+import math
+
+import numpy as np
+
+from detections import detection_boxes, empty_detections
+from motion_gate import MotionGate
+
+# Requested capture size in tiled mode; drivers fall back to the largest size they support
+FULL_RESOLUTION = (3840, 2160)
+
+
+def tile_starts(length, tile_size, overlap):
+    """Tile offsets along one axis, spread evenly so the last tile ends at the edge"""
+    if length <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1 - overlap)))
+    count = math.ceil((length - tile_size) / step) + 1
+    return [round(i * (length - tile_size) / (count - 1)) for i in range(count)]
+
+
+def tile_grid(width, height, tile_size=640, overlap=0.2):
+    """Return the (x1, y1, x2, y2) tiles covering a frame, neighbours sharing `overlap` of their size"""
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in tile_starts(height, tile_size, overlap)
+            for x in tile_starts(width, tile_size, overlap)]
+
+
+def offset_detections(detections, x, y):
+    """Move detections found in a tile back into frame coordinates"""
+    detections['x1'] += x
+    detections['x2'] += x
+    detections['y1'] += y
+    detections['y2'] += y
+    return detections
+
+
+def merge_detections(detections, crop_ids, overlap_threshold=0.6):
+    """Cross-tile NMS: per class, keep the most confident box and drop the boxes of other crops it mostly covers.
+
+    Overlap is measured over the smaller box, because an object cut by a tile edge
+    leaves a partial box that has a low IoU with the full one. Boxes from the same
+    crop already went through YOLO's own NMS and are left alone, so a tight flock survives.
+    """
+    if len(detections) < 2:
+        return detections
+    order = np.argsort(-detections['conf'], kind='stable')
+    detections = detections[order]
+    crop_ids = crop_ids[order]
+    boxes = detection_boxes(detections)
+    areas = (boxes[:, 2:] - boxes[:, :2]).clip(0).prod(axis=1)
+
+    keep = np.ones(len(detections), dtype=bool)
+    for i in range(len(detections)):
+        if not keep[i]:
+            continue
+        rest = np.flatnonzero(keep[i + 1:]) + i + 1
+        rest = rest[(detections['cls'][rest] == detections['cls'][i]) & (crop_ids[rest] != crop_ids[i])]
+        if not len(rest):
+            continue
+        top_left = np.maximum(boxes[i, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[i, 2:], boxes[rest, 2:])
+        overlap = (bottom_right - top_left).clip(0).prod(axis=1)
+        smaller = np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        keep[rest[overlap / smaller > overlap_threshold]] = False
+    return detections[keep]
+
+
+def merge_crops(offsets, detections, overlap_threshold=0.6):
+    """Combine the detections of one frame's crops into a single de-duplicated array"""
+    if len(detections) == 1:
+        (x, y), = offsets
+        return offset_detections(detections[0], x, y)
+    parts = [offset_detections(found, x, y) for (x, y), found in zip(offsets, detections)]
+    if not any(len(found) for found in parts):
+        return empty_detections()
+    crop_ids = np.repeat(np.arange(len(parts)), [len(found) for found in parts])
+    return merge_detections(np.concatenate(parts), crop_ids, overlap_threshold)
+
+
+def overlaps(tile, regions):
+    x1, y1, x2, y2 = tile
+    return any(x1 < rx2 and rx1 < x2 and y1 < ry2 and ry1 < y2 for rx1, ry1, rx2, ry2 in regions)
+
+
+def contains(tile, region):
+    return tile[0] <= region[0] and tile[1] <= region[1] and region[2] <= tile[2] and region[3] <= tile[3]
+
+
+class TiledDetector:
+    """Splits high-resolution frames into overlapping tiles and only runs the tiles that moved"""
+
+    def __init__(self, tile_size=640, overlap=0.2, full_frame=True,
+                 motion_threshold=0.005, force_interval=5.0):
+        self.tile_size = tile_size
+        self.overlap = overlap  # Share of a tile repeated in its neighbour, so objects on an edge are seen whole once
+        self.full_frame = full_frame  # Also run the downscaled whole frame, for objects bigger than a tile
+        self.motion_threshold = motion_threshold
+        self.force_interval = force_interval
+
+        self.layouts = {}  # Camera name -> (frame shape, tiles, one motion gate per tile)
+
+        # Statistics
+        self.tiles_seen = 0
+        self.tiles_outside = 0  # Never run because they lie outside every zone
+        self.tiles_run = 0
+
+    def layout(self, key, frame):
+        height, width = frame.shape[:2]
+        layout = self.layouts.get(key)
+        if layout is None or layout[0] != (height, width):
+            tiles = tile_grid(width, height, self.tile_size, self.overlap)
+            gates = [MotionGate(self.motion_threshold, self.force_interval) for _ in tiles]
+            layout = self.layouts[key] = ((height, width), tiles, gates)
+        return layout
+
+    def active_tiles(self, key, frame, use_motion=True, now=None, regions=None):
+        """Return the tiles of a frame worth running; an empty list means nothing moved.
+
+        With regions, tiles outside all of them are never run.
+        """
+        _, tiles, gates = self.layout(key, frame)
+        self.tiles_seen += len(tiles)
+        candidates = [(tile, gate) for tile, gate in zip(tiles, gates)
+                      if regions is None or overlaps(tile, regions)]
+        self.tiles_outside += len(tiles) - len(candidates)
+        if not use_motion:
+            active = [tile for tile, _ in candidates]
+        else:
+            active = [tile for tile, gate in candidates
+                      if gate.should_detect(frame[tile[1]:tile[3], tile[0]:tile[2]], now)]
+        self.tiles_run += len(active)
+        return active
+
+    def crops(self, key, frame, use_motion=True, now=None, regions=None):
+        """Return (offset, image) pairs for one batched model call, or [] for a static frame.
+
+        With regions, the downscaled pass for large objects covers the regions that moved
+        instead of the whole frame.
+        """
+        tiles = self.active_tiles(key, frame, use_motion, now, regions)
+        if not tiles:
+            return []
+        crops = [((x1, y1), frame[y1:y2, x1:x2]) for x1, y1, x2, y2 in tiles]
+        if self.full_frame and len(self.layouts[key][1]) > 1:
+            if regions is None:
+                # YOLO scales the whole-frame boxes back to frame coordinates itself
+                crops.append(((0, 0), frame))
+            else:
+                # A region inside one tile is already seen whole by that tile
+                for x1, y1, x2, y2 in regions:
+                    region = (x1, y1, x2, y2)
+                    if overlaps(region, tiles) and not any(contains(tile, region) for tile in tiles):
+                        crops.append(((x1, y1), frame[y1:y2, x1:x2]))
+        return crops
+
+    def skip_ratio(self):
+        """Share of the tiles inside the zones that motion let skip"""
+        candidates = self.tiles_seen - self.tiles_outside
+        return 1 - self.tiles_run / candidates if candidates else 0.0
+
+    def summary(self):
+        outside = f", {self.tiles_outside} outside the zones" if self.tiles_outside else ""
+        return (f"ran {self.tiles_run}/{self.tiles_seen} tiles{outside} "
+                f"({self.skip_ratio():.0%} of the rest skipped by motion)")
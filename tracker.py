@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+
+from detections import box_iou, detection_boxes
+
+
+class Track:
+    """One object followed across frames"""
+
+    def __init__(self, track_id, cls_id, box, now):
+        self.track_id = track_id
+        self.cls_id = cls_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.missed = 0  # Consecutive detection runs without a match
+        self.alerted = False
+        self.authorized = False  # Kept until a face check on this track fails or it leaves
+        self.rejected = False  # A face was checked and matched no authorized user
+        self.zone = -1  # Camera zone index of the latest detection
+        self.last_saved = None
+
+    def check_face(self, authorized, rejected):
+        """Apply one frame's face result: a match authorizes, only a failed check revokes it"""
+        if authorized:
+            self.authorized = True
+        elif rejected:
+            self.authorized = False
+            self.rejected = True
+
+    def age(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        return now - self.first_seen
+
+
+class IoUTracker:
+    """Greedy IoU tracker that assigns stable ids and reports enter/leave events"""
+
+    def __init__(self, iou_threshold=0.3, max_missed=5):
+        self.iou_threshold = iou_threshold  # Minimum overlap to continue a track
+        self.max_missed = max_missed  # Detection runs a track may go unseen before it leaves
+        self.tracks = []
+        self.next_id = 1
+
+    def update(self, detections, now=None):
+        """Match detections to tracks; return (track id per detection, entered tracks, left tracks)"""
+        if now is None:
+            now = time.monotonic()
+
+        track_ids = np.zeros(len(detections), dtype=np.int32)
+        matched_tracks = set()
+
+        if self.tracks and len(detections):
+            track_boxes = np.array([track.box for track in self.tracks], dtype=np.float32)
+            track_classes = np.array([track.cls_id for track in self.tracks])
+            iou = box_iou(track_boxes, detection_boxes(detections))
+
+            # Tracks only continue with detections of the same class
+            iou[track_classes[:, None] != detections['cls'][None, :]] = 0
+            iou[iou < self.iou_threshold] = 0
+
+            # Greedily take the best remaining pair until nothing overlaps
+            while iou.size and iou.max() > 0:
+                t, d = np.unravel_index(np.argmax(iou), iou.shape)
+                track = self.tracks[t]
+                track.box = detection_boxes(detections[d:d + 1])[0]
+                track.last_seen = now
+                track.missed = 0
+                track_ids[d] = track.track_id
+                matched_tracks.add(t)
+                iou[t, :] = 0
+                iou[:, d] = 0
+
+        # Unmatched detections start new tracks
+        entered = []
+        for d in np.flatnonzero(track_ids == 0):
+            track = Track(self.next_id, int(detections['cls'][d]),
+                          detection_boxes(detections[d:d + 1])[0], now)
+            self.next_id += 1
+            track_ids[d] = track.track_id
+            entered.append(track)
+
+        # Tracks that went unseen for too long leave
+        left = []
+        remaining = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    left.append(track)
+                    continue
+            remaining.append(track)
+        self.tracks = remaining + entered
+
+        return track_ids, entered, left
+
+    def get(self, track_id):
+        for track in self.tracks:
+            if track.track_id == track_id:
+                return track
+        return None